@@ -3,7 +3,102 @@ from CTkMessagebox import CTkMessagebox
 import tkinter as tk
 from tkinter import StringVar
 from habit_manager import HabitManager
-
+from gui_worker import BackgroundWorker
+
+# milliseconds between two checks for finished database requests, about one frame at 60 fps
+POLL_INTERVAL = 16
+# the display area keeps only the latest lines, so its memory doesn't grow while the application runs
+MAX_LOG_LINES = 1000
+# number of rows the habit list shows and loads at once
+PAGE_SIZE = 20
+
+
+class HabitListView:
+    """ table of all habits that only renders the visible page and loads the pages with HabitManager.page_habits """
+
+    def __init__(self, parent, gui, periodicity = None):
+        self.gui = gui
+        self.habit_manager = gui.habit_manager
+        # with a periodicity the table only lists the habits with that periodicity
+        self.periodicity = periodicity
+        # cursors of the pages before the current one, the last entry is the start of the current page
+        self.page_starts = [None]
+        self.next_cursor = None
+
+        controls = ctk.CTkFrame(parent, fg_color="transparent")
+        controls.pack(fill="x", padx=10, pady=5)
+        ctk.CTkLabel(controls, text="sort by:").pack(side="left", padx=5)
+        # a sort column with "highest first" shows the best streaks and the longest periods at the top
+        self.order_var = StringVar(value="name")
+        ctk.CTkOptionMenu(controls, variable=self.order_var, values=["name", "streak", "periodicity"], command=lambda value: self.reload()).pack(side="left", padx=5)
+        self.descending_var = tk.BooleanVar(value=False)
+        ctk.CTkCheckBox(controls, text="highest first", variable=self.descending_var, command=self.reload).pack(side="left", padx=5)
+
+        # one label per visible row, they are reused for every page instead of creating a widget per habit
+        table = ctk.CTkFrame(parent)
+        table.pack(fill="both", expand=True, padx=10, pady=5)
+        self.row_labels = [ctk.CTkLabel(table, text="", anchor="w", font=("Courier", 13)) for i in range(PAGE_SIZE)]
+        for label in self.row_labels:
+            label.pack(fill="x", padx=10)
+
+        navigation = ctk.CTkFrame(parent, fg_color="transparent")
+        navigation.pack(fill="x", padx=10, pady=5)
+        self.previous_button = ctk.CTkButton(navigation, text="< previous", command=self.previous_page, width=100, fg_color="royalblue")
+        self.previous_button.pack(side="left", padx=5)
+        self.page_label = ctk.CTkLabel(navigation, text="")
+        self.page_label.pack(side="left", expand=True)
+        self.next_button = ctk.CTkButton(navigation, text="next >", command=self.next_page, width=100, fg_color="royalblue")
+        self.next_button.pack(side="right", padx=5)
+
+        # scrolling the mouse wheel over the table turns the pages
+        # X11 reports the wheel as the buttons 4 and 5
+        for widget in [table] + self.row_labels:
+            for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                widget.bind(sequence, self.on_mouse_wheel)
+
+        self.load_page()
+
+    def load_page(self):
+        """ requests the page that starts at the last cursor in page_starts """
+        self.gui.run_in_background(
+            self.habit_manager.page_habits,
+            self.page_starts[-1], PAGE_SIZE, self.order_var.get(), self.descending_var.get(), self.periodicity,
+            on_done=self.show_page,
+            # turning pages quickly only renders the page the user stopped at, every open list has its own tag
+            tag=("habit page", id(self))
+        )
+
+    def show_page(self, page):
+        """ renders the rows of a loaded page into the reused labels """
+        habits = page['habits']
+        for label, habit in zip(self.row_labels, habits + [None] * (PAGE_SIZE - len(habits))):
+            label.configure(text="" if habit is None else f"{habit['name'][:40]:<40} streak: {habit['streak']:<6} periodicity: {habit['periodicity']}")
+        self.next_cursor = page['next']
+        self.page_label.configure(text=f"page {len(self.page_starts)}")
+        self.previous_button.configure(state="normal" if len(self.page_starts) > 1 else "disabled")
+        self.next_button.configure(state="normal" if self.next_cursor is not None else "disabled")
+
+    def next_page(self):
+        if self.next_cursor is not None:
+            self.page_starts.append(self.next_cursor)
+            self.next_cursor = None
+            self.load_page()
+
+    def previous_page(self):
+        if len(self.page_starts) > 1:
+            self.page_starts.pop()
+            self.load_page()
+
+    def reload(self):
+        """ starts again at the first page, after the sort order changed """
+        self.page_starts = [None]
+        self.load_page()
+
+    def on_mouse_wheel(self, event):
+        if event.num == 5 or event.delta < 0:
+            self.next_page()
+        else:
+            self.previous_page()
 
 
 class HabitGUI:
@@ -20,12 +115,45 @@ class HabitGUI:
         self.display_area = ctk.CTkTextbox(self.root, height=300, width=600)
         self.display_area.pack(padx=15, pady=10)
 
+        # shows that a database request is still running
+        self.status_label = ctk.CTkLabel(self.root, text="")
+        self.status_label.pack(padx=15, anchor="w")
+
+        # every HabitManager call runs on the worker thread, so a slow query never blocks the main loop
+        self.worker = BackgroundWorker()
+        self.poll_worker()
+
+    def run_in_background(self, function, *args, on_done=None, tag=None):
+        """ runs a HabitManager call on the worker thread and on_done with its result on the Tk thread
+            a newer request with the same tag cancels an older one that hasn't finished yet """
+        self.worker.submit(function, *args, on_done=on_done, on_error=self.show_error, tag=tag)
+        self.status_label.configure(text="working ...")
+
+    def poll_worker(self):
+        """ hands the finished requests to their callbacks and checks again after POLL_INTERVAL """
+        self.worker.poll()
+        if not self.worker.busy:
+            self.status_label.configure(text="")
+        self.root.after(POLL_INTERVAL, self.poll_worker)
+
+    def show_error(self, error):
+        """ shows the error of a failed request in a message box """
+        CTkMessagebox(title="Error", message=str(error))
+
+    def close(self):
+        """ waits for the requests that are still queued, so no change is lost when the window closes """
+        # the results are not polled, their callbacks would update widgets that were already destroyed
+        self.worker.close()
     
+
     def update_display(self, message):
         """ Update the display area with a message """
         self.display_area.insert("end", message + "\n")
+        # drop the oldest lines once the display area holds more than MAX_LOG_LINES
+        lines = int(self.display_area.index("end-1c").split(".")[0])
+        if lines > MAX_LOG_LINES:
+            self.display_area.delete("1.0", f"{lines - MAX_LOG_LINES + 1}.0")
         self.display_area.see("end")
-        self.display_area.update_idletasks()
 
     def clear_display(self):
         """ clears the display area """
@@ -74,12 +202,12 @@ class HabitGUI:
                 return
 
             if name and periodicity > 0:
-                try:
-                    self.habit_manager.add_habit(name, periodicity)
+                def created(result):
                     self.update_display(f"The habit '{name}' was successfully created with a periodicity of '{periodicity}'.\n")
                     new_habit_window.destroy()
-                except ValueError as e:
-                    CTkMessagebox(title="Error", message=str(e))
+
+                # errors like an existing name are shown in a message box by show_error
+                self.run_in_background(self.habit_manager.add_habit, name, periodicity, on_done=created)
             else:
                 CTkMessagebox(title="Warning", message="Input Required. Please provide both name and periodicity.")
 
@@ -135,12 +263,11 @@ class HabitGUI:
         def submit():
             name = name_entry.get()
             if name:
-                try:
-                    message = self.habit_manager.delete_habit(name)
+                def deleted(message):
                     self.update_display(message)
                     delete_habit_window.destroy()
-                except ValueError as e:
-                    CTkMessagebox(title="Error", message= str(e))
+
+                self.run_in_background(self.habit_manager.delete_habit, name, on_done=deleted)
             else:
                 CTkMessagebox(title="Error", message= "Input required, please enter a habit name.")
 
@@ -170,19 +297,15 @@ class HabitGUI:
                 CTkMessagebox(title="Error", message= "Please enter the name of a habit that you want to check off. ")
                 return
             
-            try:
+            def checked_off(message):
                 # capture the message from the check_off method
-                message = self.habit_manager.check_off_habit(habit_name)
-                
                 if message:
                     self.update_display(message)
                     
                 else:
                     self.update_display("no message returned from check_off_habit")
-                
-                    
-            except ValueError as e:
-                CTkMessagebox(title="Error", message= str(e))
+
+            self.run_in_background(self.habit_manager.check_off_habit, habit_name, on_done=checked_off)
            
         # create a new window for checking off habits
         check_window = ctk.CTkToplevel(self.root)
@@ -202,15 +325,22 @@ class HabitGUI:
         entry.pack(pady=5)
         ctk.CTkButton(check_window, text="habit finished", command=check_action,font=button_font, fg_color="royalblue").pack(pady=10)
 
-    def show_all_habits_from_manager(self):
-        # get the habits from the HabitManager
-        habits_text = self.habit_manager.show_all_habits()
-        self.update_display(habits_text)
+    def show_all_habits_from_manager(self, periodicity = None):
+        """ opens the habit list, which loads the habits page by page instead of writing all of them into the display area """
+        list_window = ctk.CTkToplevel(self.root)
+        list_window.title("all my habits" if periodicity is None else f"my {self.habit_manager.periodicity_to_text(periodicity)} habits")
+        list_window.geometry("700x650+600+250")
+
+        # Keep the new window on top temporarily
+        list_window.attributes("-topmost", True)
+        list_window.after(100, lambda: list_window.attributes("-topmost", False))
+
+        HabitListView(list_window, self, periodicity)
 
     def show_habits(self,periodicity):
         """  displays the habits based on the selected periodicity  """
-        message = self.habit_manager.show_habits_by_periodicity(periodicity)
-        self.update_display(message)
+        # the same paged list as all habits, filtered by the (periodicity, name) index
+        self.show_all_habits_from_manager(periodicity)
 
     def analyze_habits(self):
            
@@ -234,8 +364,7 @@ class HabitGUI:
 
         def display_most_misses():
             """ prints the habits that was missed to be checked off the most """
-            result = self.habit_manager.most_misses()
-            self.update_display(result)  
+            self.run_in_background(self.habit_manager.most_misses, on_done=self.update_display, tag="most misses")
 
         button_font = ("Arial", 14)    
 
@@ -244,11 +373,13 @@ class HabitGUI:
 
         def display_longest_streak():
             """ prints the habit with the longest streak """
-            result = self.habit_manager.longest_streak()
-            if result is None:
-                self.update_display("No habits found.")
-            else:
-                self.update_display(f"Your longest streak is {result['longest_streak']} for the habit '{result['name']}'.\n")
+            def show_result(result):
+                if result is None:
+                    self.update_display("No habits found.")
+                else:
+                    self.update_display(f"Your longest streak is {result['longest_streak']} for the habit '{result['name']}'.\n")
+
+            self.run_in_background(self.habit_manager.longest_streak, on_done=show_result, tag="longest streak")
 
         button_font = ("Arial", 14)
 
@@ -277,8 +408,7 @@ class HabitGUI:
                 habit_name = entry.get().strip()
                 # ensure that the input is not empty
                 if habit_name:
-                    result = self.habit_manager.longest_streak_for_habit(habit_name)
-                    self.update_display(result)
+                    self.run_in_background(self.habit_manager.longest_streak_for_habit, habit_name, on_done=self.update_display, tag="habit streak")
                     # close the window after button click
                     streak_window.destroy()
                 else:
@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+import numpy as np
+from timestamps import EPOCH_ORDINAL
+
+# numeric habit columns loaded into the arrays, in this order
+HABIT_COLUMNS = ("periodicity", "streak", "longest_streak", "checked_off", "milestone")
+
+
+class HabitAnalytics:
+    """ vectorized statistics over all habits and their misses, loaded into NumPy arrays once """
+
+    def __init__(self, db):
+        # ConnectionManager of the HabitManager
+        self.db = db
+        self.load()
+
+    def load(self):
+        """ reads the habit table and the daily miss counts into arrays """
+        # the counts and the rows are read in one transaction, so a commit in between can't change the number of rows
+        with self.db.read_transaction() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM habit").fetchone()[0]
+            cur = conn.execute(f"SELECT rowid, name, {', '.join(HABIT_COLUMNS)} FROM habit ORDER BY rowid")
+            dtype = [("rowid", np.int64), ("name", object)] + [(column, np.int64) for column in HABIT_COLUMNS]
+            self.habits = np.fromiter(cur, dtype = dtype, count = count)
+            self.names = self.habits["name"]
+
+            # the reset_log is loaded through its daily counts, one row per habit and day with misses
+            count = conn.execute("SELECT COUNT(*) FROM miss_daily JOIN habit ON habit.name = miss_daily.name").fetchone()[0]
+            # miss_daily counts the days since 1970, adding EPOCH_ORDINAL makes them match date.toordinal()
+            cur = conn.execute(
+                f"""
+                SELECT habit.rowid, miss_daily.day + {EPOCH_ORDINAL}, miss_daily.misses
+                FROM miss_daily JOIN habit ON habit.name = miss_daily.name"""
+            )
+            misses = np.fromiter(cur, dtype = [("rowid", np.int64), ("day", np.int64), ("misses", np.int64)], count = count)
+        # position of every miss row in the habit arrays
+        self.miss_habit = np.searchsorted(self.habits["rowid"], misses["rowid"])
+        self.miss_day = misses["day"]
+        self.miss_count = misses["misses"]
+
+    def misses_per_habit(self, days = 30, today = None):
+        """ returns the number of misses of every habit in the past days as an array in habit order """
+        today = today or date.today()
+        first_day = (today - timedelta(days = days)).toordinal()
+        inside = self.miss_day >= first_day
+        return np.bincount(self.miss_habit[inside], weights = self.miss_count[inside], minlength = len(self.habits)).astype(np.int64)
+
+    def streak_distribution(self, metric = "streak"):
+        """ returns how many habits have each value of streak or longest_streak """
+        values, counts = np.unique(self.habits[metric], return_counts = True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+    def percentiles(self, metric = "streak", percentiles = (50, 90, 99)):
+        """ returns the percentiles of a habit column """
+        if not len(self.habits):
+            return {percentile: 0 for percentile in percentiles}
+        return dict(zip(percentiles, np.percentile(self.habits[metric], percentiles).tolist()))
+
+    def by_periodicity(self, days = 30, today = None):
+        """ returns count, completion rate, mean streak and miss rate for every periodicity """
+        periodicity = self.habits["periodicity"]
+        misses = self.misses_per_habit(days, today)
+        # number of periods every habit had in the window, at least one
+        periods = np.maximum(days // np.maximum(periodicity, 1), 1)
+
+        groups, group_of_habit, counts = np.unique(periodicity, return_inverse = True, return_counts = True)
+        checked_off = np.bincount(group_of_habit, weights = self.habits["checked_off"], minlength = len(groups))
+        streaks = np.bincount(group_of_habit, weights = self.habits["streak"], minlength = len(groups))
+        missed = np.bincount(group_of_habit, weights = misses, minlength = len(groups))
+        possible = np.bincount(group_of_habit, weights = periods, minlength = len(groups))
+
+        return {
+            int(group) : {
+                'habits' : int(count),
+                'completion_rate' : float(checked_off[i] / count),
+                'mean_streak' : float(streaks[i] / count),
+                'miss_rate' : float(missed[i] / possible[i])
+            }
+            for i, (group, count) in enumerate(zip(groups, counts))
+        }
+
+    def correlations(self, days = 30, today = None):
+        """ returns the correlation of periodicity, streak, longest streak and misses with each other """
+        columns = ("periodicity", "streak", "longest_streak", "misses")
+        if len(self.habits) < 2:
+            return {}
+        matrix = np.corrcoef(np.vstack([self.habits["periodicity"], self.habits["streak"], self.habits["longest_streak"], self.misses_per_habit(days, today)]))
+        # a column without any variance has no defined correlation
+        matrix = np.nan_to_num(matrix)
+        return {first : {second : float(matrix[i, j]) for j, second in enumerate(columns)} for i, first in enumerate(columns)}
+
+    def longest_streak(self):
+        """ returns the habit with the longest streak like HabitManager.longest_streak """
+        if not len(self.habits):
+            return None
+        i = int(np.argmax(self.habits["longest_streak"]))
+        return {'name' : self.names[i], 'longest_streak' : int(self.habits["longest_streak"][i])}
+
+    def summary(self, days = 30, today = None):
+        """ returns all statistics in one dictionary for the GUI and the command line """
+        return {
+            'habits' : len(self.habits),
+            'longest_streak' : self.longest_streak(),
+            'streak_percentiles' : self.percentiles("streak"),
+            'streak_distribution' : self.streak_distribution("streak"),
+            'by_periodicity' : self.by_periodicity(days, today),
+            'correlations' : self.correlations(days, today)
+        }
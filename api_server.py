@@ -0,0 +1,296 @@
+import argparse
+import http.client
+import json
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from time import perf_counter
+from urllib.parse import parse_qs, unquote, urlsplit
+from habit_manager import HabitManager
+from metrics import metrics
+
+
+class HabitAPI:
+    """ maps the JSON endpoints to the HabitManager, shared by all request threads """
+
+    def __init__(self, habit_manager):
+        self.habit_manager = habit_manager
+        # the in-memory habits are changed and read by the same methods, so those calls run one at a time
+        # queries that only read the database run in parallel on the pooled reader connections
+        self.memory_lock = threading.RLock()
+        # (method, path template, handler, needs the memory lock), {name} matches one path segment
+        routes = [
+            ("GET", "/habits", self.list_habits, False),
+            ("POST", "/habits", self.add_habit, True),
+            ("DELETE", "/habits/{name}", self.delete_habit, True),
+            ("POST", "/habits/{name}/checkoff", self.check_off_habit, True),
+            ("GET", "/habits/{name}/misses", self.missed_counts, False),
+            ("GET", "/analytics/longest-streak", self.longest_streak, True),
+            ("GET", "/analytics/top", self.top_k, True),
+            ("GET", "/analytics/most-misses", self.most_misses, False),
+            ("GET", "/next-due", self.next_due, True)
+        ]
+        self.routes = [(method, template, re.compile(re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", template)), handler, needs_lock) for method, template, handler, needs_lock in routes]
+
+    def dispatch(self, method, path, query, body):
+        """ runs the handler of a request and returns the status code, the JSON payload and the matched route """
+        allowed = False
+        for route_method, template, pattern, handler, needs_lock in self.routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            arguments = {name: unquote(value) for name, value in match.groupdict().items()}
+            try:
+                if needs_lock:
+                    with self.memory_lock:
+                        return handler(query, body, **arguments) + (template,)
+                return handler(query, body, **arguments) + (template,)
+            except (KeyError, TypeError, ValueError) as e:
+                # the HabitManager reports wrong input like unknown habits with a ValueError
+                return 400, {'error' : str(e).strip()}, template
+            except Exception as e:
+                # e.g. a locked database, the connection stays usable for the next request
+                return 500, {'error' : str(e)}, template
+        if allowed:
+            return 405, {'error' : f"{method} is not allowed for {path}"}, "unknown"
+        return 404, {'error' : f"{path} not found"}, "unknown"
+
+    def submit(self, function, *args, on_done = None, on_error = None, tag = None):
+        """ runs a call under the memory lock on the calling thread, the reset job of the scheduler uses it like the worker of the GUI """
+        with self.memory_lock:
+            try:
+                result = function(*args)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                return on_error(e)
+        if on_done is not None:
+            on_done(result)
+        return result
+
+    def list_habits(self, query, body):
+        # the pages are read from the database, so they don't wait for the memory lock
+        # the cursor of the next page is passed back as a JSON array
+        after = json.loads(query["after"]) if "after" in query else None
+        return 200, self.habit_manager.page_habits(
+            after = after,
+            limit = int(query.get("limit", 50)),
+            order_by = query.get("order_by", "name"),
+            descending = query.get("descending", "false") == "true",
+            periodicity = int(query["periodicity"]) if "periodicity" in query else None
+        )
+
+    def add_habit(self, query, body):
+        self.habit_manager.add_habit(body["name"], body["periodicity"])
+        return 201, {'name' : body["name"], 'periodicity' : int(body["periodicity"])}
+
+    def delete_habit(self, query, body, name):
+        return 200, {'message' : self.habit_manager.delete_habit(name).strip()}
+
+    def check_off_habit(self, query, body, name):
+        message = self.habit_manager.check_off_habit(name)
+        habit = self.habit_manager.habits[name.lower()]
+        return 200, {'message' : message.strip(), 'streak' : habit.streak, 'longest_streak' : habit.longest_streak}
+
+    def missed_counts(self, query, body, name):
+        if "days" in query:
+            return 200, {'name' : name, 'misses' : {query["days"] : self.habit_manager.missed_counter(name, int(query["days"]))}}
+        # JSON only allows strings as keys
+        return 200, {'name' : name, 'misses' : {str(days) : count for days, count in self.habit_manager.missed_counts(name).items()}}
+
+    def longest_streak(self, query, body):
+        return 200, {'longest_streak' : self.habit_manager.longest_streak()}
+
+    def top_k(self, query, body):
+        return 200, {'top' : self.habit_manager.top_k(query.get("metric", "streak"), int(query.get("k", 10)))}
+
+    def most_misses(self, query, body):
+        return 200, {'message' : self.habit_manager.most_misses(int(query.get("days", 30))).strip()}
+
+    def next_due(self, query, body):
+        due = self.habit_manager.next_due(int(query.get("count", 5)))
+        return 200, {'due' : [{'name' : entry['name'], 'day' : entry['day'].isoformat()} for entry in due]}
+
+
+class HabitRequestHandler(BaseHTTPRequestHandler):
+    """ parses one JSON request, keeps the connection open for the next one with HTTP/1.1 """
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, with Nagle's algorithm every keep-alive response would wait for a delayed ACK
+    disable_nagle_algorithm = True
+    # an idle keep-alive connection gives its worker back to the pool after this many seconds
+    timeout = 5
+
+    def handle_request(self, method):
+        start = perf_counter()
+        url = urlsplit(self.path)
+        # repeated parameters are not used, the last value wins
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length)) if length else {}
+        except json.JSONDecodeError as e:
+            status, payload, route = 400, {'error' : f"invalid JSON: {e}"}, "unknown"
+        else:
+            status, payload, route = self.server.api.dispatch(method, url.path.rstrip("/") or "/", query, body)
+
+        seconds = perf_counter() - start
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        # lets the clients see the time spent in the server without the network
+        self.send_header("Server-Timing", f"app;dur={seconds * 1000:.3f}")
+        self.end_headers()
+        self.wfile.write(data)
+        # counted per route instead of per path, so the habit names don't create new operations
+        if metrics.enabled:
+            metrics.record_call(f"http {method} {route}", seconds, failed = status >= 500)
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+    def do_PUT(self):
+        # answered with a JSON 405 like every other method a route doesn't support
+        self.handle_request("PUT")
+
+    def log_message(self, format, *args):
+        # the latency of every request is in the metrics instead of the terminal
+        pass
+
+
+class HabitAPIServer(HTTPServer):
+    """ HTTP server that hands every connection to a bounded pool of worker threads """
+
+    # the kernel queues this many connections while all workers are busy
+    request_queue_size = 128
+
+    def __init__(self, habit_manager, host = "127.0.0.1", port = 8765, max_workers = 8):
+        super().__init__((host, port), HabitRequestHandler)
+        self.api = HabitAPI(habit_manager)
+        self.pool = ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = "habit-api")
+
+    def process_request(self, request, client_address):
+        """ runs the connection on the pool instead of a new thread per connection """
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+
+def load_test(host = "127.0.0.1", port = 8765, requests = 2000, concurrency = 8, path = "/habits?limit=20"):
+    """ sends requests from concurrency keep-alive connections and returns the requests per second and latencies """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client(count):
+        connection = http.client.HTTPConnection(host, port)
+        own = []
+        for i in range(count):
+            start = perf_counter()
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            own.append(perf_counter() - start)
+            if response.status >= 400:
+                errors.append(response.status)
+        connection.close()
+        with lock:
+            latencies.extend(own)
+
+    # spread the requests over the clients, the first ones take the remainder
+    counts = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    threads = [threading.Thread(target = client, args = (count,)) for count in counts]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests' : len(latencies),
+        'errors' : len(errors),
+        'seconds' : seconds,
+        'requests_per_second' : len(latencies) / seconds if seconds else 0.0,
+        'p50' : latencies[len(latencies) // 2] if latencies else 0.0,
+        'p99' : latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] if latencies else 0.0
+    }
+
+def main(argv = None):
+    """ command line entry point to serve the API or to run the load test against a running server """
+    parser = argparse.ArgumentParser(description = "JSON API for the habit tracker")
+    parser.add_argument("action", choices = ["serve", "load-test"])
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8765)
+    parser.add_argument("--db", default = "habit.db", help = "database file")
+    parser.add_argument("--workers", type = int, default = 8, help = "number of request threads")
+    parser.add_argument("--requests", type = int, default = 2000, help = "number of requests of the load test")
+    parser.add_argument("--concurrency", type = int, default = 8, help = "number of connections of the load test")
+    parser.add_argument("--path", default = "/habits?limit=20", help = "endpoint the load test requests")
+    args = parser.parse_args(argv)
+
+    if args.action == "load-test":
+        result = load_test(args.host, args.port, args.requests, args.concurrency, args.path)
+        print(f"{result['requests']} requests in {result['seconds']:.2f} s: {result['requests_per_second']:.0f} requests/s, "
+              f"p50 {result['p50'] * 1000:.2f} ms, p99 {result['p99'] * 1000:.2f} ms, {result['errors']} errors")
+        return 0
+
+    # WAL lets the request threads read while the shared writer commits
+    habit_manager = HabitManager(args.db, profile = "balanced", snapshot = True)
+    habit_manager.initialize_database()
+    habit_manager.load_habits_into_memory()
+    habit_manager.catch_up_missed_periods()
+    metrics.enable()
+    server = HabitAPIServer(habit_manager, args.host, args.port, args.workers)
+
+    # APScheduler is only needed while serving, so the load test starts without it
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from main import schedule_next_reset
+    # the periods that end while the server runs are closed like in the GUI, under the memory lock of the request threads
+    scheduler = BackgroundScheduler()
+    scheduler.start()
+    schedule_next_reset(scheduler, habit_manager, server.api)
+    habit_manager.due_listener = lambda: schedule_next_reset(scheduler, habit_manager, server.api)
+
+    print(f"serving the habit tracker on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # no reset may start while the connections are closed
+        scheduler.shutdown()
+        server.server_close()
+        habit_manager.close()
+        # the latency of every endpoint since the start
+        for name, counters in metrics.as_dict().items():
+            if name.startswith("http ") and counters["calls"]:
+                print(f"{name:<40} {counters['calls']:>8} requests {counters['seconds'] / counters['calls'] * 1000:10.3f} ms mean")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
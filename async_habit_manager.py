@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from habit_manager import HabitManager
+
+
+class AsyncHabitManager:
+    """ awaitable facade over a HabitManager that keeps the SQLite work off the event loop """
+
+    def __init__(self, habit_manager = None, db_name = "habit.db", max_readers = 4, profile = "balanced"):
+        # the default profile uses WAL, so the readers run while the writer commits
+        # a HabitManager that is passed in keeps its own profile
+        self.habit_manager = habit_manager or HabitManager(db_name, profile = profile)
+        # analytics queries run in parallel, each reader thread has its own pooled connection
+        self.readers = ThreadPoolExecutor(max_workers = max_readers, thread_name_prefix = "habit-reader")
+        # a single writer thread serializes every change and owns the in-memory habits
+        self.writer = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "habit-writer")
+        # writes waiting for the writer thread as (function, arguments, future)
+        self.pending_writes = []
+        self.write_lock = threading.Lock()
+
+    async def read(self, function, *args):
+        """ runs a read-only database query on the reader pool """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.readers, function, *args)
+
+    def write(self, function, *args):
+        """ queues a change for the writer thread, all changes queued in the meantime are run by one task of the writer """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.write_lock:
+            self.pending_writes.append((function, args, future))
+            # the first queued write schedules a batch, later ones join it until the writer picks it up
+            start_batch = len(self.pending_writes) == 1
+        if start_batch:
+            self.writer.submit(self.run_writes, loop)
+        return future
+
+    def run_writes(self, loop):
+        """ runs all queued writes on the writer thread one after another """
+        with self.write_lock:
+            writes, self.pending_writes = self.pending_writes, []
+
+        # every call commits on its own, an outer transaction would hold the connection lock while the manager
+        # flushes its write buffers, which take their own lock first and the connection lock second
+        for function, args, future in writes:
+            # a failing call, like a check-off of a missing habit, only fails its own future and changes nothing
+            try:
+                result, error = function(*args), None
+            except Exception as e:
+                result, error = None, e
+            loop.call_soon_threadsafe(self.resolve, future, result, error)
+
+    @staticmethod
+    def resolve(future, result, error):
+        """ hands the outcome of a write to its awaiting coroutine """
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def add_habit(self, name, periodicity):
+        return await self.write(self.habit_manager.add_habit, name, periodicity)
+
+    async def delete_habit(self, name):
+        return await self.write(self.habit_manager.delete_habit, name)
+
+    async def check_off_habit(self, name):
+        return await self.write(self.habit_manager.check_off_habit, name)
+
+    async def show_all_habits(self):
+        # the report reads the in-memory habits, so it runs on the writer thread that changes them
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.writer, self.habit_manager.show_all_habits)
+
+    async def missed_counter(self, habit_name):
+        return await self.read(self.habit_manager.missed_counter, habit_name)
+
+    async def most_misses(self):
+        return await self.read(self.habit_manager.most_misses)
+
+    async def close(self):
+        """ waits for the queued work and closes the HabitManager """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.writer, self.habit_manager.close)
+        self.readers.shutdown()
+        self.writer.shutdown()
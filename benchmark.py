@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from itertools import islice
+from time import perf_counter
+from habit_manager import REPORT_PAGE_SIZE, HabitManager
+from habit_tracker import STARTUP_TARGET
+from timestamps import SECONDS_PER_DAY, to_epoch
+
+# sizes of the seeded databases when no sizes are given on the command line
+DEFAULT_SIZES = [1000, 100000, 1000000]
+# periodicities the seeded habits cycle through
+PERIODICITIES = [1, 7, 28, 3]
+
+
+def seed_database(db_name, size, profile = "durable"):
+    """ creates a database with the given number of habits and a missed time for every tenth habit """
+    hm = HabitManager(db_name, profile = profile)
+    hm.initialize_database()
+    now = datetime.now()
+    # the epoch seconds of now are computed once, the seeded times are whole days before it
+    now_seconds, offset = to_epoch(now)
+
+    def habits():
+        for i in range(size):
+            periodicity = PERIODICITIES[i % len(PERIODICITIES)]
+            # every fifth habit ends its period today, so the reset pass has work to do
+            # and every seventh skipped a few periods, so the catch-up pass has work to do
+            if i % 5 == 0:
+                age = periodicity
+            elif i % 7 == 0:
+                age = periodicity * (i % 4 + 1) + 1
+            else:
+                age = i % periodicity
+            yield (f"habit {i}", f"habit {i}", periodicity, i % 30, i % 60, i % 2, now_seconds - age * SECONDS_PER_DAY, offset, i % 30 // 7)
+
+    def missed_times():
+        for i in range(0, size, 10):
+            yield (f"habit {i}", now_seconds - i % 40 * SECONDS_PER_DAY, offset)
+
+    with hm.db.transaction() as db:
+        db.executemany("INSERT INTO habit (name, name_key, periodicity, streak, longest_streak, checked_off, creation_time, utc_offset, milestone) VALUES (?,?,?,?,?,?,?,?,?)", habits())
+        db.executemany("INSERT INTO reset_log (name, missed_time, utc_offset) VALUES (?,?,?)", missed_times())
+    hm.close()
+
+def measure(function, repeat = 1):
+    """ runs the function repeat times and returns the mean time of one call in seconds """
+    start = perf_counter()
+    for i in range(repeat):
+        function(i)
+    return (perf_counter() - start) / repeat
+
+def run_size(size, repeat = 100, profile = "durable"):
+    """ seeds a database with size habits and times the hot paths of the HabitManager on it """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "benchmark.db")
+        start = perf_counter()
+        seed_database(db_name, size, profile)
+        results["seed_database"] = perf_counter() - start
+        # a command line call on the seeded habits, once loading the habit table and once reading the snapshot of the previous call
+        results["startup_without_snapshot"] = measure_startup(2, db_name, ["--no-snapshot"])
+        results["startup_with_snapshot"] = measure_startup(2, db_name)
+
+        hm = HabitManager(db_name, profile = profile)
+        hm.initialize_database()
+        results["load_habits_into_memory"] = measure(lambda i: hm.load_habits_into_memory())
+        # the snapshot is written once and then read by every load of the unchanged database
+        hm.snapshot = True
+        results["save_snapshot"] = measure(lambda i: hm.save_snapshot())
+        results["load_from_snapshot"] = measure(lambda i: hm.load_habits_into_memory())
+        hm.snapshot = False
+        results["catch_up_missed_periods"] = measure(lambda i: hm.catch_up_missed_periods())
+        results["add_habit"] = measure(lambda i: hm.add_habit(f"new habit {i}", 1), repeat)
+        # the seeded habits are checked off round-robin, so a repeat larger than half the size stays on existing habits
+        results["check_off_habit"] = measure(lambda i: hm.check_off_habit(f"habit {i * 2 % size}"), repeat)
+        results["delete_habit"] = measure(lambda i: hm.delete_habit(f"new habit {i}"), repeat)
+        results["show_all_habits"] = measure(lambda i: hm.show_all_habits(), 10)
+        # the lines of the first page of the streamed report, the time doesn't grow with the number of habits
+        results["first_report_page"] = measure(lambda i: list(islice(hm.report_lines(), REPORT_PAGE_SIZE)), repeat)
+        results["most_misses"] = measure(lambda i: hm.most_misses(), repeat)
+        results["missed_counter"] = measure(lambda i: hm.missed_counter(f"habit {i * 10}"), repeat)
+        # scheduled_reset in main.py runs reset_due_habits, calling it directly keeps the GUI imports out of the benchmark
+        results["scheduled_reset"] = measure(lambda i: hm.reset_due_habits())
+        hm.close()
+    return results
+
+def measure_startup(repeat = 5, db_name = None, options = ()):
+    """ returns the mean time of a headless command line call, including the interpreter start
+        without a db_name the calls run on a new database """
+    with tempfile.TemporaryDirectory() as directory:
+        command = [sys.executable, "-m", "habit_tracker", "--db", db_name or os.path.join(directory, "startup.db"), *options, "next-due"]
+        # run from the directory of the modules so python -m finds habit_tracker
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        # the first call creates the database, writes the snapshot and fills the file system caches
+        subprocess.run(command, check = True, capture_output = True, cwd = cwd)
+        return measure(lambda i: subprocess.run(command, check = True, capture_output = True, cwd = cwd), repeat)
+
+def run(sizes, repeat = 100, profile = "durable"):
+    """ runs the benchmark for every size and returns the report as a dictionary """
+    return {
+        "created" : datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "python" : platform.python_version(),
+        "sqlite" : sqlite3.sqlite_version,
+        "profile" : profile,
+        "repeat" : repeat,
+        "startup" : measure_startup(),
+        # JSON only allows strings as keys
+        "results" : {str(size) : run_size(size, repeat, profile) for size in sizes}
+    }
+
+def compare(report, baseline, threshold = 1.2):
+    """ returns the operations that got slower than threshold times their baseline as (size, operation, baseline, current) """
+    regressions = []
+    for size, operations in report["results"].items():
+        for operation, seconds in operations.items():
+            baseline_seconds = baseline["results"].get(size, {}).get(operation)
+            if baseline_seconds and seconds > baseline_seconds * threshold:
+                regressions.append((size, operation, baseline_seconds, seconds))
+    return regressions
+
+def main(argv = None):
+    """ command line entry point, returns 1 when a regression against the baseline was found """
+    parser = argparse.ArgumentParser(description = "time the HabitManager hot paths on seeded databases")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = DEFAULT_SIZES, help = "number of habits of the seeded databases")
+    parser.add_argument("--repeat", type = int, default = 100, help = "number of calls of the per-habit operations")
+    parser.add_argument("--profile", default = "durable", help = "SQLite tuning profile of the HabitManager")
+    parser.add_argument("--output", help = "write the results as JSON to this file")
+    parser.add_argument("--baseline", help = "JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type = float, default = 1.2, help = "slowdown factor that counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.repeat, args.profile)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent = 2)
+
+    print(f"command line startup: {report['startup'] * 1000:.3f} ms (target {STARTUP_TARGET * 1000:.0f} ms)")
+    for size, operations in report["results"].items():
+        print(f"\n{size} habits:")
+        for operation, seconds in operations.items():
+            print(f"  {operation:<26} {seconds * 1000:12.3f} ms")
+
+    status = 0
+    if report["startup"] > STARTUP_TARGET:
+        print(f"regression: the command line startup took longer than {STARTUP_TARGET * 1000:.0f} ms")
+        status = 1
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        for size, operation, baseline_seconds, seconds in regressions:
+            print(f"regression: {operation} with {size} habits took {seconds * 1000:.3f} ms instead of {baseline_seconds * 1000:.3f} ms")
+        if regressions:
+            status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
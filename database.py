@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+from itertools import count
+from contextlib import contextmanager
+from metrics import metrics
+
+# named SQLite tunings, the pragmas are applied to every connection when it is opened
+# cache_size is negative to give the size in KiB instead of pages, mmap_size is given in bytes and busy_timeout in milliseconds
+PROFILES = {
+    # rollback journal and a full sync on every commit, like an untuned SQLite database
+    "durable" : {"journal_mode" : "DELETE", "synchronous" : "FULL", "mmap_size" : 0, "cache_size" : -2000, "busy_timeout" : 5000},
+    # WAL lets the scheduler and the GUI read while the other one writes, NORMAL only syncs at checkpoints
+    "balanced" : {"journal_mode" : "WAL", "synchronous" : "NORMAL", "mmap_size" : 64 * 1024 * 1024, "cache_size" : -16000, "busy_timeout" : 5000},
+    # fastest setting, the last commits can be lost when the machine crashes but the database stays consistent
+    "throughput" : {"journal_mode" : "WAL", "synchronous" : "OFF", "mmap_size" : 256 * 1024 * 1024, "cache_size" : -64000, "busy_timeout" : 10000},
+}
+
+
+class ConnectionManager:
+    """ keeps the SQLite connections open so the schema and prepared statements are reused between operations """
+
+    # number of prepared statements every connection keeps in its cache (the sqlite3 default is 128)
+    statement_cache_size = 256
+
+    def __init__(self, db_name="habit.db", profile="durable"):
+        self.db_name = db_name
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown tuning profile '{profile}', please choose one of: {', '.join(PROFILES)}.")
+        self.profile = profile
+        # every thread gets its own connection for reading, SQLite connections must not be shared between threads while in use
+        self._local = threading.local()
+        # remember all opened connections so close() can reach the ones of other threads as well
+        self._connections = []
+        self._lock = threading.Lock()
+        # all threads write through one shared connection, so changes of this manager never show up as foreign changes in data_version
+        self._writer = None
+        self._write_lock = threading.RLock()
+        # depth of nested transaction() blocks, only the outermost block commits
+        self._depth = 0
+        # numbers every opened writer connection so data versions of different connections are never compared
+        self._serial = count(1)
+        self._writer_serial = None
+
+    def open(self):
+        """ opens a new connection to the database file """
+        # check_same_thread is disabled so close() can close the connections of finished threads
+        conn = sqlite3.connect(self.db_name, cached_statements = self.statement_cache_size, check_same_thread = False)
+        # the journal mode is stored in the database file and set by the writer, the other pragmas belong to each connection
+        for pragma, value in PROFILES[self.profile].items():
+            if pragma != "journal_mode":
+                conn.execute(f"PRAGMA {pragma} = {value}")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def connection(self):
+        """ returns the open read connection of the calling thread and opens it on first use """
+        # every connection to :memory: is a separate database, so everything has to go through the writer
+        if self.db_name == ":memory:":
+            return self.writer()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.open()
+        return conn
+
+    def writer(self):
+        """ returns the connection shared by all writes and opens it on first use """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self.open()
+                # the journal mode belongs to the database file, a WAL database is never switched back
+                # leaving WAL fails with "database is locked" while another program like the GUI has the file open
+                journal_mode = PROFILES[self.profile]["journal_mode"]
+                current_mode = self._writer.execute("PRAGMA journal_mode").fetchone()[0]
+                if current_mode.lower() != journal_mode.lower() and current_mode.lower() != "wal":
+                    self._writer.execute(f"PRAGMA journal_mode = {journal_mode}")
+                self._writer_serial = next(self._serial)
+            return self._writer
+
+    def execute(self, sql, parameters = ()):
+        """ runs a single read statement on the connection of the calling thread and returns the cursor """
+        # the sqlite3 module looks up the prepared statement by its SQL text, so repeated queries skip the parsing
+        return self.connection().execute(sql, parameters)
+
+    def pragmas(self):
+        """ returns the values of the tuned pragmas that are in effect on the writer connection """
+        with self._write_lock:
+            conn = self.writer()
+            return {pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in PROFILES[self.profile]}
+
+    def data_version(self):
+        """ returns a value that changes whenever another connection commits a change to the database """
+        # PRAGMA data_version is only comparable on the same connection, so the connection number is part of the value
+        with self._write_lock:
+            version = self.writer().execute("PRAGMA data_version").fetchone()[0]
+            return (self._writer_serial, version)
+
+    @contextmanager
+    def transaction(self):
+        """ groups all statements inside the with-block into one transaction on the writer connection, nested blocks join the outer one """
+        # the lock keeps other threads out of the writer connection until the outermost block is finished
+        with self._write_lock:
+            conn = self.writer()
+            if self._depth == 0:
+                # rows changed by this transaction, counted for the metrics
+                changes = conn.total_changes
+                if not conn.in_transaction:
+                    # take the write lock of the database right away and make schema changes part of the transaction
+                    conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield conn
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    conn.rollback()
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    conn.commit()
+                    metrics.record_commit(conn.total_changes - changes)
+
+    @contextmanager
+    def read_transaction(self):
+        """ runs the queries inside the with-block on one snapshot of the database, commits of other connections show up after it """
+        # an in-memory database only has the writer connection, so the block joins its transactions
+        if self.db_name == ":memory:":
+            with self.transaction() as conn:
+                yield conn
+            return
+        conn = self.connection()
+        # a deferred transaction keeps the snapshot of its first read until it ends
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            # nothing was written, so ending the transaction can't lose a change
+            conn.rollback()
+
+    def close(self):
+        """ closes the connections of all threads and the writer connection """
+        with self._write_lock:
+            with self._lock:
+                for conn in self._connections:
+                    conn.close()
+                self._connections.clear()
+            self._writer = None
+            # forget the closed connections so the next call opens fresh ones
+            self._local = threading.local()
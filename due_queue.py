@@ -0,0 +1,66 @@
+from heapq import heapify, heappop, heappush
+
+
+class DueQueue:
+    """ priority queue of the days on which the current periods of the habits end """
+
+    def __init__(self):
+        # heap of (day, key) entries, day is the ordinal of the date the period ends
+        self.heap = []
+        # key -> day of its valid entry, heap entries that don't match are left over from earlier schedules
+        self.due = {}
+
+    def __len__(self):
+        return len(self.due)
+
+    def rebuild(self, items):
+        """ replaces the queue with the (key, day) pairs of all habits """
+        self.due = dict(items)
+        self.heap = [(day, key) for key, day in self.due.items()]
+        heapify(self.heap)
+
+    def schedule(self, key, day):
+        """ sets the day on which the period of a habit ends, an earlier schedule of the habit is dropped """
+        self.due[key] = day
+        heappush(self.heap, (day, key))
+        # rebuild the heap once most of its entries are left over from earlier schedules
+        if len(self.heap) > 2 * len(self.due) + 64:
+            self.rebuild(self.due.items())
+
+    def remove(self, key):
+        """ removes a habit from the queue, its heap entry is skipped when it comes up """
+        self.due.pop(key, None)
+
+    def is_current(self, entry):
+        """ checks if a heap entry is the valid schedule of its habit """
+        day, key = entry
+        return self.due.get(key) == day
+
+    def peek(self):
+        """ returns the (day, key) entry that is due first without removing it, or None for an empty queue """
+        while self.heap and not self.is_current(self.heap[0]):
+            heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def pop_until(self, day):
+        """ removes and returns the (day, key) entries of all habits whose period ends on or before the given day """
+        entries = []
+        while self.heap and self.heap[0][0] <= day:
+            entry = heappop(self.heap)
+            if self.is_current(entry):
+                entries.append(entry)
+                # a duplicate entry of the same schedule is now left over as well
+                del self.due[entry[1]]
+        return entries
+
+    def upcoming(self, count):
+        """ returns the next count (day, key) entries in the order they are due, without removing them """
+        entries = []
+        while len(entries) < count and self.peek() is not None:
+            entry = heappop(self.heap)
+            # a habit that was scheduled twice for the same day only appears once
+            if not entries or entries[-1] != entry:
+                entries.append(entry)
+        for entry in entries:
+            heappush(self.heap, entry)
+        return entries
@@ -0,0 +1,87 @@
+import queue
+import threading
+from itertools import count
+
+
+class BackgroundWorker:
+    """ runs the HabitManager calls of the GUI on a background thread and hands the results back to the Tk thread """
+
+    def __init__(self):
+        # requests waiting for the worker thread, one thread keeps the calls in the order they were made
+        self.requests = queue.Queue()
+        # finished requests waiting to be picked up by poll on the Tk thread
+        self.results = queue.Queue()
+        # tag -> generation of its latest request, older requests with the same tag are stale
+        self.generations = {}
+        self.next_generation = count(1)
+        # number of requests that were submitted but not handed back yet
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def busy(self):
+        """ True while a request is waiting or running """
+        return self.pending > 0
+
+    def submit(self, function, *args, on_done = None, on_error = None, tag = None):
+        """ queues a call for the worker thread, a newer request with the same tag cancels this one """
+        generation = next(self.next_generation)
+        with self.lock:
+            if tag is not None:
+                self.generations[tag] = generation
+            self.pending += 1
+            # the thread is started with the first request
+            if self.thread is None:
+                self.thread = threading.Thread(target = self.run, name = "gui-worker", daemon = True)
+                self.thread.start()
+        self.requests.put((tag, generation, function, args, on_done, on_error))
+        return generation
+
+    def is_stale(self, tag, generation):
+        """ checks if a newer request with the same tag was submitted """
+        return tag is not None and self.generations.get(tag) != generation
+
+    def run(self):
+        """ worker thread: runs the requests one by one until close puts None into the queue """
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            tag, generation, function, args, on_done, on_error = request
+            # a request that was replaced before it started is skipped without touching the database
+            if self.is_stale(tag, generation):
+                self.results.put((tag, generation, None, None, None, None))
+                continue
+            try:
+                self.results.put((tag, generation, on_done, function(*args), on_error, None))
+            except Exception as e:
+                self.results.put((tag, generation, on_done, None, on_error, e))
+
+    def poll(self):
+        """ runs the callbacks of all finished requests, must be called on the Tk thread, returns the number of callbacks """
+        handled = 0
+        while True:
+            try:
+                tag, generation, on_done, result, on_error, error = self.results.get_nowait()
+            except queue.Empty:
+                return handled
+            with self.lock:
+                self.pending -= 1
+            # results of replaced requests are dropped so an old report never overwrites a newer one
+            if self.is_stale(tag, generation):
+                continue
+            if error is not None:
+                if on_error is None:
+                    raise error
+                on_error(error)
+            elif on_done is not None:
+                on_done(result)
+            handled += 1
+
+    def close(self):
+        """ lets the worker thread finish the queued requests and stop """
+        if self.thread is not None:
+            self.requests.put(None)
+            self.thread.join()
+            self.thread = None
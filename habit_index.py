@@ -0,0 +1,83 @@
+from bisect import bisect_left, insort
+
+
+class HabitIndex:
+    """ secondary indexes over the in-memory habits, ordered by streak and longest streak """
+
+    # habit attributes that can be queried in order
+    metrics = ("streak", "longest_streak")
+
+    def __init__(self):
+        # metric -> sorted list of (value, key) tuples
+        self.ordered = {metric: [] for metric in self.metrics}
+        # key -> the values the habit was indexed with, needed to find its old entries when it changes
+        self.indexed = {}
+
+    def __len__(self):
+        return len(self.indexed)
+
+    def rebuild(self, habits):
+        """ replaces the whole index with the habits of the given dictionary """
+        self.indexed = {key: self.values_of(habit) for key, habit in habits.items()}
+
+        # sorting once is faster than inserting every habit on its own
+        for position, metric in enumerate(self.metrics):
+            self.ordered[metric] = sorted((values[position], key) for key, values in self.indexed.items())
+
+    def values_of(self, habit):
+        """ returns the indexed values of a habit as (streak, longest_streak) """
+        return (habit.streak, habit.longest_streak)
+
+    def update(self, key, habit):
+        """ adds a habit to the index or moves it to the position of its current values """
+        old_values = self.indexed.get(key)
+        values = self.values_of(habit)
+        if old_values == values:
+            return
+
+        for position, metric in enumerate(self.metrics):
+            if old_values is not None:
+                if old_values[position] == values[position]:
+                    continue
+                self.discard_ordered(metric, old_values[position], key)
+            insort(self.ordered[metric], (values[position], key))
+
+        self.indexed[key] = values
+
+    def update_many(self, habits):
+        """ updates a batch of (key, habit) pairs, a large batch sorts the ordered lists once instead of inserting every habit """
+        habits = list(habits)
+        # every insort moves the rest of the list, so beyond a small batch sorting again is cheaper
+        if len(habits) * 64 < len(self.indexed):
+            for key, habit in habits:
+                self.update(key, habit)
+            return
+
+        for key, habit in habits:
+            self.indexed[key] = self.values_of(habit)
+
+        for position, metric in enumerate(self.metrics):
+            self.ordered[metric] = sorted((values[position], key) for key, values in self.indexed.items())
+
+    def remove(self, key):
+        """ removes a habit from all indexes """
+        values = self.indexed.pop(key, None)
+        if values is None:
+            return
+        for position, metric in enumerate(self.metrics):
+            self.discard_ordered(metric, values[position], key)
+
+    def discard_ordered(self, metric, value, key):
+        """ removes the (value, key) entry of a metric with a binary search """
+        entries = self.ordered[metric]
+        position = bisect_left(entries, (value, key))
+        if position < len(entries) and entries[position] == (value, key):
+            del entries[position]
+
+    def top_k(self, metric, k):
+        """ returns the (key, value) pairs of the k habits with the highest value of the metric """
+        if metric not in self.ordered:
+            raise ValueError(f"Unknown metric '{metric}', please choose one of: {', '.join(self.metrics)}.")
+        entries = self.ordered[metric]
+        # the highest values are at the end of the sorted list
+        return [(key, value) for value, key in reversed(entries[max(len(entries) - k, 0):])] if k > 0 else []
@@ -0,0 +1,85 @@
+import argparse
+import csv
+import json
+import sys
+
+# columns of an exported habit, in the order of the habit table
+FIELDS = ("name", "periodicity", "streak", "longest_streak", "checked_off", "creation_time", "milestone")
+
+
+def read_csv(stream):
+    """ yields one dictionary per row of a CSV file with a header line """
+    yield from csv.DictReader(stream)
+
+def read_jsonl(stream):
+    """ yields every non-empty line of a JSON lines file, the lines are decoded row by row while importing them """
+    # decoding here would stop the whole import at the first malformed line
+    for line in stream:
+        if line.strip():
+            yield line
+
+def write_csv(stream, rows):
+    """ writes the habit rows as CSV with a header line and returns the number of rows """
+    writer = csv.DictWriter(stream, fieldnames = FIELDS, extrasaction = "ignore")
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+def write_jsonl(stream, rows):
+    """ writes one JSON object per habit row and returns the number of rows """
+    count = 0
+    for row in rows:
+        stream.write(json.dumps(row) + "\n")
+        count += 1
+    return count
+
+
+READERS = {"csv" : read_csv, "jsonl" : read_jsonl}
+WRITERS = {"csv" : write_csv, "jsonl" : write_jsonl}
+
+
+def file_format(path, chosen_format = None):
+    """ returns the chosen file format or derives it from the file extension """
+    file_format = chosen_format or path.rsplit(".", 1)[-1].lower()
+    if file_format not in READERS:
+        raise ValueError(f"Unknown file format '{file_format}', please use csv or jsonl.")
+    return file_format
+
+def main(argv = None):
+    """ command line entry point for importing and exporting habits """
+    # imported here because habit_manager uses the writers of this module
+    from habit_manager import HabitManager
+
+    parser = argparse.ArgumentParser(description = "import or export habits as CSV or JSON lines")
+    parser.add_argument("action", choices = ["import", "export"])
+    parser.add_argument("path", help = "file to read from or write to")
+    parser.add_argument("--format", choices = sorted(READERS), help = "file format, derived from the file extension by default")
+    parser.add_argument("--db", default = "habit.db", help = "database file")
+    parser.add_argument("--batch-size", type = int, default = 1000, help = "number of habits inserted per transaction")
+    args = parser.parse_args(argv)
+
+    chosen_format = file_format(args.path, args.format)
+    # the same profile as the GUI, so the database can be used by both at the same time
+    habit_manager = HabitManager(args.db, profile = "balanced")
+    habit_manager.initialize_database()
+    try:
+        if args.action == "import":
+            with open(args.path, newline = "", encoding = "utf-8") as stream:
+                result = habit_manager.import_habits(READERS[chosen_format](stream), batch_size = args.batch_size)
+            print(f"imported {result['imported']} habits, skipped {len(result['duplicates'])} duplicates and {len(result['invalid'])} invalid rows")
+            for name in result['duplicates']:
+                print(f"duplicate: {name}", file = sys.stderr)
+            for row_number, message in result['invalid']:
+                print(f"invalid row {row_number}: {message}", file = sys.stderr)
+        else:
+            with open(args.path, "w", newline = "", encoding = "utf-8") as stream:
+                count = habit_manager.export_habits(stream, chosen_format)
+            print(f"exported {count} habits to {args.path}")
+    finally:
+        habit_manager.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,137 @@
+import json
+import os
 import sqlite3
-from datetime import datetime, timedelta, time
+import sys
+from datetime import date, datetime, timedelta, time
+from time import perf_counter
 from habits import Habits
+from database import ConnectionManager
+from migrations import habit_changes, migrate, schema_version
+from habit_index import HabitIndex
+from due_queue import DueQueue
+from habit_io import FIELDS, WRITERS
+from write_buffer import GroupCommitBuffer
+from metrics import instrumented, metrics
+from timestamps import day_number, from_epoch, to_epoch
+from snapshot import read_snapshot, snapshot_path, write_snapshot
+
+# windows in days that missed_counts reports at once
+MISS_WINDOWS = (7, 30, 90, 365)
+# time of day at which the habits whose period ends on that day are reset
+RESET_TIME = time(23, 59, 57)
+# turns the stored epoch seconds back into the local time text of the export files
+EXPORT_CREATION_TIME = "strftime('%Y-%m-%d %H:%M:%S', creation_time + IFNULL(utc_offset, 0), 'unixepoch')"
+# columns page_habits can sort by, the name is always added to make the order unique
+PAGE_ORDERS = ("name", "streak", "periodicity")
+# number of habits the reports read per query, the first lines are ready after one page regardless of the number of habits
+REPORT_PAGE_SIZE = 500
 
 class HabitManager:
-    def __init__(self,db_name="habit.db"):
+    def __init__(self,db_name="habit.db", checkoff_latency=0.5, write_behind=False, flush_interval=1.0, max_unflushed=100, profile="durable", snapshot=False):
+        # secondary indexes by streak and longest streak, kept up to date by every method that changes a habit
+        self.index = HabitIndex()
+        # priority queue of the days on which the periods of the habits end, so a reset only looks at the due habits
+        self.due_queue = DueQueue()
+        # called without arguments whenever the next reset time moves to an earlier day, e.g. to reschedule a timer
+        self.due_listener = None
+        # check-off events are written in groups, checkoff_latency is the longest time an event waits for its commit
+        self.checkoff_log = GroupCommitBuffer(self.write_checkoff_log, max_latency = checkoff_latency)
+        # in write-behind mode check-offs only change the in-memory habit and the database is updated later
+        # a crash loses at most max_unflushed habits or flush_interval seconds of check-offs
+        self.habit_writes = None
+        if write_behind:
+            self.habit_writes = GroupCommitBuffer(self.write_habit_updates, max_latency = flush_interval, max_size = max_unflushed, key = lambda row: row[-1])
         self.habits = {}
+        # SQLite tuning profile of the connections, see database.PROFILES
+        self.profile = profile
+        # data version of the database at the last load, None means the habits have not been loaded yet
+        self.loaded_version = None
+        # with snapshot the habits are written to a binary file on close and read from it by the next load of an unchanged database
+        self.snapshot = snapshot
+        # change counter of the habit table the snapshot file was written or read at
+        self.snapshot_changes = None
+        self.db = None
         self.db_name = db_name
 
+    @property
+    def habits(self):
+        """ in-memory storage of all habits, keyed by name """
+        return self._habits
+
+    @habits.setter
+    def habits(self, habits):
+        """ replaces the in-memory storage and rebuilds the indexes for it """
+        self._habits = habits
+        self.index.rebuild(habits)
+        self.due_queue.rebuild((key, self.due_day(habit)) for key, habit in habits.items())
+
+    @property
+    def db_name(self):
+        """ name of the database file the connection manager is bound to """
+        return self.db.db_name
+
+    @db_name.setter
+    def db_name(self, db_name):
+        """ binds the manager to another database file and drops the connections to the old one """
+        if self.db is not None:
+            if self.db.db_name == db_name:
+                return
+            # buffered changes still belong to the old database
+            self.flush()
+            self.db.close()
+        self.db = ConnectionManager(db_name, self.profile)
+        self.loaded_version = None
+        self.snapshot_changes = None
+
+    @property
+    def snapshot_path(self):
+        """ file of the binary snapshot, None when snapshots are turned off or the database is in memory """
+        return snapshot_path(self.db_name) if self.snapshot else None
+
+    def flush(self):
+        """ writes all buffered habit changes and check-off events to the database """
+        if self.habit_writes is not None:
+            self.habit_writes.flush()
+        self.checkoff_log.flush()
+
+    def close(self):
+        """ writes the buffered changes and check-off events, saves the snapshot and closes all open database connections """
+        if self.habit_writes is not None:
+            self.habit_writes.close()
+        self.checkoff_log.close()
+        try:
+            if self.snapshot:
+                self.save_snapshot()
+        finally:
+            self.db.close()
+
     def initialize_database(self):
-        """ creates the habit and reset_log table if it doesn't exist in the database """
-        with sqlite3.connect(self.db_name) as db:
-            cur = db.cursor()
-            # this creates the table that stores the habit details
-            cur.execute("""
-                        CREATE TABLE IF NOT EXISTS habit(name TEXT PRIMARY KEY,
-                        periodicity INTEGER NOT NULL,
-                        streak INTEGER DEFAULT 0,
-                        longest_streak INTEGER DEFAULT 0,
-                        checked_off INTEGER DEFAULT 0, 
-                        creation_time TEXT,
-                        milestone INTEGER DEFAULT 0
-                         )""")
-            # this creates the table that stores the dates when a habit was missed to be checked off in time 
-            # id as primary key, so 'name' can appear multiple times inside the table      
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS reset_log(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                missed_time TEXT DEFAULT NULL,
-                FOREIGN KEY (name) REFERENCES habit (name))"""
-            )
-            db.commit()
+        """ creates the tables or upgrades an existing database to the latest schema version """
+        return migrate(self.db)
 
+    @instrumented
     def load_habits_into_memory(self):
         """ loads all habits from the database into memory """
+        # buffered changes would be overwritten by the older values in the database
+        self.flush()
+
+        # remember the data version before reading so a change during the load triggers the next reload
+        self.loaded_version = self.db.data_version()
+
+        # the snapshot of the last run is used as long as the habit table wasn't changed since it was written
+        if self.load_snapshot():
+            return
+
         #fetch all the required habit details from the habits table 
-        with sqlite3.connect(self.db_name) as db:
-            cur = db.cursor()
-            cur.execute("SELECT * FROM habit") # select everything
-            habits = cur.fetchall()
+        habits = self.db.execute("SELECT name_key, name, periodicity, streak, longest_streak, checked_off, creation_time, utc_offset, milestone FROM habit").fetchall()
+        metrics.record_rows_read(len(habits))
 
         # clear existing in-memory storage
         self.habits.clear()
 
 
         # fill the in-memory storage with instances of the Habit class by looping 
-        for name, periodicity, streak, longest_streak, checked_off, creation_time, milestone in habits:
+        for name_key, name, periodicity, streak, longest_streak, checked_off, creation_time, utc_offset, milestone in habits:
             
  
             habit = Habits(
@@ -55,13 +140,86 @@ class HabitManager:
                 streak = int(streak),
                 longest_streak = int(longest_streak),
                 checked_off = int(checked_off),
+                # the epoch seconds are turned into the local time of the habit without parsing a string
+                creation_time = from_epoch(creation_time, utc_offset) if creation_time is not None else None,
+                milestone = int(milestone),
+                db_name = self.db_name,
+                db = self.db
+            )
+            # keyed by the lowercase name like the habits added by add_habit
+            self.habits[name_key] = habit
+
+        # rebuild the secondary indexes and the due queue for the new in-memory storage
+        self.index.rebuild(self.habits)
+        self.due_queue.rebuild((key, self.due_day(habit)) for key, habit in self.habits.items())
+
+    @instrumented
+    def load_snapshot(self):
+        """ fills the in-memory storage from the binary snapshot, returns False when there is none or it is stale """
+        path = self.snapshot_path
+        if path is None:
+            return False
+        changes = habit_changes(self.db)
+        rows = read_snapshot(path, schema_version(self.db), changes)
+        if rows is None:
+            return False
+
+        self.habits.clear()
+        # the snapshot holds the due days, so the ends of the periods aren't calculated again
+        due_days = []
+        db_name = self.db_name
+        for key, name, creation_time, day, periodicity, streak, longest_streak, milestone, checked_off in rows:
+            due_days.append((key, day))
+            self.habits[key] = Habits(
+                name = name,
+                periodicity = periodicity,
+                streak = streak,
+                longest_streak = longest_streak,
+                checked_off = checked_off,
                 creation_time = creation_time,
-                milestone = int(milestone)  
+                milestone = milestone,
+                db_name = db_name,
+                db = self.db
             )
-            self.habits[name] = habit
 
+        self.index.rebuild(self.habits)
+        self.due_queue.rebuild(due_days)
+        self.snapshot_changes = changes
+        return True
+
+    @instrumented
+    def save_snapshot(self):
+        """ writes the in-memory habits to the binary snapshot, returns False when they might not match the database """
+        path = self.snapshot_path
+        if path is None or self.loaded_version is None:
+            return False
+        # buffered check-offs are part of the snapshot, so they have to be in the database as well
+        self.flush()
+        changes = habit_changes(self.db)
+        # another connection changed the database after the last load, the habits in memory are older than the table
+        if self.db.data_version() != self.loaded_version:
+            return False
+        # nothing changed since the snapshot was written or read
+        if changes == self.snapshot_changes and os.path.exists(path):
+            return True
+        write_snapshot(path, self.habits, self.due_queue.due, schema_version(self.db), changes)
+        self.snapshot_changes = changes
+        return True
+
+    @instrumented
+    def refresh_habits(self):
+        """ reloads the habits only when the database was changed by another connection since the last load """
+        # changes made through this manager are already applied to the in-memory storage
+        if self.db.data_version() == self.loaded_version:
+            return False
+        self.load_habits_into_memory()
+        return True
+
+    @instrumented
     def add_habit(self,name,periodicity):
         """ adds a new habit and periodicity to the in-memory list and the database """
+        # load the changes of other programs like the command line first, so they aren't overwritten
+        self.refresh_habits()
 
         # convert the name to lowercase
         normalized_name = name.lower()
@@ -75,6 +233,10 @@ class HabitManager:
             periodicity = int(periodicity)
         except ValueError:
             raise ValueError("The periodicity must be entered as a number of days.")
+        # a period of zero or fewer days never ends, so its misses would be logged again with every reset
+        # the GUI checks this as well, the command line and the API pass the number as it was entered
+        if periodicity <= 0:
+            raise ValueError("The periodicity must be a positive number of days.")
         
         # use existing habit values (if intended to add more customization in the future), otherwhise the default values will be used
         existing_habit = self.habits.get(normalized_name)
@@ -89,37 +251,141 @@ class HabitManager:
             creation_time = existing_habit.creation_time if existing_habit else creation_time,
             checked_off = existing_habit.checked_off if existing_habit else 0,
             milestone = existing_habit.milestone if existing_habit else 0,
-            db_name = existing_habit.db_name if existing_habit else None 
+            db_name = self.db_name,
+            db = self.db
             )
 
         # add to the in-memory storage
         self.habits[normalized_name] = new_habit
+        self.index.update(normalized_name, new_habit)
+        self.schedule_reset(normalized_name)
         
         # add to the database
-        with sqlite3.connect(self.db_name) as db:
-            cur = db.cursor()
-            try:
+        try:
+            with self.db.transaction() as db:
                 # add to the habit table
-                cur.execute('''
+                db.execute('''
                                INSERT INTO habit (
                             name,
+                            name_key,
                             periodicity,
                             streak,
                             longest_streak,
                             checked_off,
                             creation_time,
+                            utc_offset,
                             milestone)
-                             VALUES (?,?,?,?,?,?,?)''',
-                               (new_habit.name, new_habit.periodicity, new_habit.streak, new_habit.longest_streak, new_habit.checked_off, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), new_habit.milestone)) # isoformat converts the datetine.now() into a string
-                db.commit()
+                             VALUES (?,?,?,?,?,?,?,?,?)''',
+                               (new_habit.name, normalized_name, new_habit.periodicity, new_habit.streak, new_habit.longest_streak, new_habit.checked_off, *to_epoch(creation_time), new_habit.milestone)) # to_epoch converts the datetime into epoch seconds and the UTC offset
+
+        # exception that prevents a crash when the name already exists
+        except sqlite3.IntegrityError: 
+            print(f"Habit '{name}' already exists in the database. Please enter another name for your habit.")
+
+    def habit_from_row(self, row):
+        """ creates a habit from an imported row, missing values fall back to the defaults of a new habit """
+        # JSON lines are decoded here, so a malformed line is reported as an invalid row like any other wrong value
+        if isinstance(row, str):
+            row = json.loads(row)
+        name = str(row["name"]).strip()
+        if not name:
+            raise ValueError("The name of the habit is missing.")
+        periodicity = int(row["periodicity"])
+        if periodicity <= 0:
+            raise ValueError("The periodicity must be a positive number of days.")
+        creation_time = row.get("creation_time") or None
+        if creation_time is not None:
+            creation_time = datetime.fromisoformat(creation_time)
+            # the files keep the naive local time, a time with a UTC offset can't be stored with to_epoch
+            if creation_time.tzinfo is not None:
+                raise ValueError("The creation_time must be a local time without a UTC offset.")
+
+        return Habits(
+            name = name,
+            periodicity = periodicity,
+            # CSV rows contain empty strings for missing values
+            streak = int(row.get("streak") or 0),
+            longest_streak = int(row.get("longest_streak") or 0),
+            checked_off = int(row.get("checked_off") or 0),
+            creation_time = creation_time,
+            milestone = int(row.get("milestone") or 0),
+            db_name = self.db_name,
+            db = self.db
+        )
+
+    @instrumented
+    def import_habits(self, rows, batch_size = 1000):
+        """ adds many habits at once in batched transactions and reports duplicates and invalid rows instead of stopping """
+        # make sure habits added by another connection are detected as duplicates
+        self.refresh_habits()
+
+        imported = 0
+        duplicates = []
+        invalid = []
+        # habits of the current batch, keyed by their normalized name
+        batch = {}
+
+        for row_number, row in enumerate(rows, start = 1):
+            try:
+                habit = self.habit_from_row(row)
+            except (KeyError, TypeError, ValueError) as e:
+                invalid.append((row_number, str(e)))
+                continue
 
-            
-            # exception that prevents a crash when the name already exists
-            except sqlite3.IntegrityError: 
-                print(f"Habit '{name}' already exists in the database. Please enter another name for your habit.")
+            normalized_name = habit.name.lower()
+            if self.habit_exists(normalized_name) or normalized_name in batch:
+                duplicates.append(habit.name)
+                continue
+
+            batch[normalized_name] = habit
+            if len(batch) >= batch_size:
+                imported += self.insert_habits(batch)
+                batch = {}
+
+        if batch:
+            imported += self.insert_habits(batch)
+
+        return {
+            'imported' : imported,
+            'duplicates' : duplicates,
+            'invalid' : invalid
+        }
 
+    def insert_habits(self, habits):
+        """ inserts a batch of new habits with one statement and adds them to the in-memory storage """
+        with self.db.transaction() as db:
+            db.executemany(
+                """
+                INSERT INTO habit (name, name_key, periodicity, streak, longest_streak, checked_off, creation_time, utc_offset, milestone)
+                VALUES (?,?,?,?,?,?,?,?,?)""",
+                ((habit.name, normalized_name, habit.periodicity, habit.streak, habit.longest_streak, habit.checked_off, *to_epoch(habit.creation_time), habit.milestone) for normalized_name, habit in habits.items())
+            )
+
+        # only add the habits to the memory once they are stored in the database
+        for normalized_name, habit in habits.items():
+            self.habits[normalized_name] = habit
+            self.index.update(normalized_name, habit)
+            self.schedule_reset(normalized_name)
+        return len(habits)
+
+    @instrumented
+    def export_habits(self, stream, file_format = "jsonl"):
+        """ writes all habits to a stream as CSV or JSON lines and returns the number of habits written """
+        # export the latest state including buffered changes
+        self.flush()
+        # the cursor hands out the rows one by one, so the export never holds the whole table in memory
+        # the files keep the readable local creation_time, the database stores epoch seconds and the UTC offset
+        columns = [EXPORT_CREATION_TIME if field == "creation_time" else field for field in FIELDS]
+        cur = self.db.execute(f"SELECT {', '.join(columns)} FROM habit ORDER BY name")
+        count = WRITERS[file_format](stream, (dict(zip(FIELDS, row)) for row in cur))
+        metrics.record_rows_read(count)
+        return count
+
+    @instrumented
     def delete_habit(self,name):
         """ deletes the habit and the periodicity from the memory and the database """
+        # load the changes of other programs like the command line first, so they aren't overwritten
+        self.refresh_habits()
 
         # convert the input name to lowercase
         normalized_name = name.lower()
@@ -129,21 +395,32 @@ class HabitManager:
             raise ValueError(f"No habit with the name '{name}' exists.\nPlease check if you entered the correct habit name.")
         
         # remove from the in-memory list
-        del self.habits[normalized_name]
+        habit = self.habits.pop(normalized_name)
+        self.index.remove(normalized_name)
+        self.due_queue.remove(normalized_name)
+
+        # buffered check-offs of the habit are written now and deleted with its history below,
+        # otherwise a habit added again under the same name would inherit them
+        self.checkoff_log.flush()
+        # in write-behind mode the buffered state of the habit would be written into a new habit with the same name
+        if self.habit_writes is not None:
+            self.habit_writes.discard(normalized_name)
 
         # remove habit from the database
-        with sqlite3.connect(self.db_name) as db:
-            cur = db.cursor()
-            
-            #normalize the name in the database as well 
-            cur.execute('DELETE FROM habit WHERE LOWER(name) = ?', (normalized_name,))
-            cur.execute('DELETE FROM reset_log WHERE LOWER(name) = ?', (normalized_name,))
-            db.commit()
+        with self.db.transaction() as db:
+            # the unique name_key index finds the row of the lowercase name
+            db.execute('DELETE FROM habit WHERE name_key = ?', (normalized_name,))
+            # the reset_log stores the name exactly like the habit table, so the (name, missed_time) index can be used
+            db.execute('DELETE FROM reset_log WHERE name = ?', (habit.name,))
+            db.execute('DELETE FROM checkoff_log WHERE name = ?', (habit.name,))
 
         return f"The habit named '{name}' was successfully deleted.\n"
                     
+    @instrumented
     def check_off_habit(self,name):
         """ identifies and validates the habit in the collection & database """
+        # load the changes of other programs like the command line first, so they aren't overwritten
+        self.refresh_habits()
 
         # convert the input name to lowercase
         normalized_name = name.lower()
@@ -154,25 +431,149 @@ class HabitManager:
         
         # get the habit object and check it off
         habit = self.habits[normalized_name]
+        was_checked_off = habit.checked_off
         # capture the return message
         message = habit.check_off() 
         
         habit.increment_milestone()
+        self.index.update(normalized_name, habit)
        
        
-        # update the habit in the database
-        with sqlite3.connect(self.db_name) as db:
-            cur = db.cursor()
-            cur.execute("""
+        # the values the habit row is updated with
+        # WHERE name_key = ? ensures that only the row corresponding to the habit being checked off is updated, whatever case the name was entered in
+        row = (habit.streak, habit.longest_streak, habit.checked_off, normalized_name)
+        if self.habit_writes is not None:
+            # write-behind: the change is written with the next flush, repeated changes of a habit are merged
+            self.habit_writes.add(row)
+        else:
+            # update the habit in the database
+            self.write_habit_updates([row])
+
+        # record the check-off in the history, a habit that was already checked off isn't counted twice
+        if not was_checked_off:
+            self.checkoff_log.add((habit.name, *to_epoch(datetime.now()), habit.streak))
+
+        return message
+
+    @instrumented
+    def write_habit_updates(self, rows):
+        """ writes the streak, longest_streak and checked_off values of checked off habits in one transaction """
+        with self.db.transaction() as db:
+            db.executemany("""
                 UPDATE habit
                 SET streak = ?, longest_streak = ?, checked_off = ?
-                WHERE name = ?
-            """,
-            #WHERE name = ? ensures that only the row corresponding to the habit being checked off is updated 
-            (habit.streak, habit.longest_streak, habit.checked_off, name))
-            db.commit()
+                WHERE name_key = ?
+            """, rows)
+
+    @instrumented
+    def write_checkoff_log(self, events):
+        """ appends a group of check-off events to the checkoff_log table in one transaction """
+        with self.db.transaction() as db:
+            # events of habits that were deleted in the meantime are skipped
+            db.executemany("""
+                INSERT INTO checkoff_log (name, checked_off_time, utc_offset, streak)
+                SELECT ?1, ?2, ?3, ?4 WHERE EXISTS (SELECT 1 FROM habit WHERE name = ?1)
+            """, events)
+
+    @instrumented
+    def reset_due_habits(self):
+        """ resets every habit whose period ends today with one transaction for all of them """
+        return self.close_periods(datetime.now().date().toordinal())
+
+    @instrumented
+    def catch_up_missed_periods(self):
+        """ closes the periods that ended before today while the application wasn't running, called at startup """
+        # periods that end today are still open and reset by the scheduler tonight
+        return self.close_periods(datetime.now().date().toordinal() - 1)
+
+    def close_periods(self, last_day):
+        """ closes every period that ended on or before the day with the given ordinal, with one transaction for all habits """
+        start = perf_counter()
+        # buffered check-offs have to be stored before the reset changes the same rows
+        self.flush()
+        # a check-off made by another program, e.g. the command line while the GUI is open, must not be reset as a miss
+        self.refresh_habits()
+
+        # take the due habits from the due queue and calculate how many of their periods ended since the last reset
+        entries = self.due_queue.pop_until(last_day)
+        try:
+            due = []
+            for day, key in entries:
+                habit = self.habits.get(key)
+                if habit is None:
+                    continue
+                step = max(habit.periodicity, 1)
+                periods = (last_day - day) // step + 1
+                # only the first of these periods can have been checked off, every later one was missed
+                missed_periods = periods - (habit.checked_off != 0)
+                # a missed habit loses its streak and milestone, a checked off habit keeps them
+                streak = 0 if missed_periods else habit.streak
+                milestone = 0 if missed_periods else habit.milestone
+                creation_time = habit.period_end() + timedelta(days = (periods - 1) * step)
+                due.append((key, habit, day, step, periods, missed_periods, creation_time, streak, milestone))
+
+            def missed_logs():
+                # one log entry for every missed period, dated at the reset time of the day the period ended
+                for key, habit, day, step, periods, missed_periods, creation_time, streak, milestone in due:
+                    for period in range(periods - missed_periods, periods):
+                        yield (habit.name, *to_epoch(datetime.combine(date.fromordinal(day + period * step), RESET_TIME)))
+
+            updates = [(*to_epoch(creation_time), streak, milestone, key) for key, habit, day, step, periods, missed_periods, creation_time, streak, milestone in due]
+
+            # log all misses and move every due habit into its current period in a single transaction
+            with self.db.transaction() as db:
+                db.executemany("INSERT INTO reset_log (name, missed_time, utc_offset) VALUES (?,?,?)", missed_logs())
+                db.executemany(
+                    """
+                    UPDATE habit
+                    SET creation_time = ?, utc_offset = ?, checked_off = 0, streak = ?, milestone = ?
+                    WHERE name_key = ?""", updates
+                )
+        except BaseException:
+            # nothing was stored, e.g. the database was locked by another program, so the habits stay due for the next reset
+            for day, key in entries:
+                if key in self.habits:
+                    self.due_queue.schedule(key, day)
+            raise
+
+        # apply the same changes to the in-memory storage once the database is updated
+        for key, habit, day, step, periods, missed_periods, creation_time, streak, milestone in due:
+            habit.creation_time = creation_time
+            habit.checked_off = 0
+            habit.streak = streak
+            habit.milestone = milestone
+            self.schedule_reset(key)
+        self.index.update_many((entry[0], entry[1]) for entry in due)
 
-        return message
+        return {
+            'reset' : len(updates),
+            'missed' : sum(entry[5] for entry in due),
+            'duration' : perf_counter() - start
+        }
+
+    def due_day(self, habit):
+        """ returns the ordinal of the day on which the current period of a habit ends """
+        return habit.period_end().date().toordinal()
+
+    def schedule_reset(self, key):
+        """ puts a habit into the due queue with the end of its current period, after adding it or changing its creation_time """
+        earliest = self.due_queue.peek()
+        day = self.due_day(self.habits[key])
+        self.due_queue.schedule(key, day)
+        # the reset timer only has to be moved when the habit is due before everything else
+        if self.due_listener is not None and (earliest is None or day < earliest[0]):
+            self.due_listener()
+
+    def next_due(self, count = 1):
+        """ returns the next count habits in the order their periods end as dictionaries with name and day """
+        return [{'name' : self.habits[key].name, 'day' : date.fromordinal(day)} for day, key in self.due_queue.upcoming(count)]
+
+    def next_reset_time(self):
+        """ returns the time of the next reset at which at least one habit is due, or None without habits """
+        entry = self.due_queue.peek()
+        if entry is None:
+            return None
+        return datetime.combine(date.fromordinal(entry[0]), RESET_TIME)
 
     def get_all_habits(self):
         return {name: {"periodicity" : habit.periodicity, "streak" : habit.streak} for name, habit in self.habits.items()}
@@ -193,32 +594,95 @@ class HabitManager:
         }
         return mapping.get(periodicity,"unknown")
 
+    def iter_habits(self, periodicity = None, page_size = REPORT_PAGE_SIZE):
+        """ yields the habits sorted by name, all of them or the ones with one periodicity
+            the habits are read one keyset page at a time, so only page_size rows are in memory at once """
+        after = None
+        while True:
+            page = self.page_habits(after = after, limit = page_size, periodicity = periodicity)
+            yield from page['habits']
+            after = page['next']
+            if after is None:
+                return
+
+    def report_lines(self, periodicity = None, page_size = REPORT_PAGE_SIZE):
+        """ yields the lines of the habit report, the CLI prints them as they come and show_all_habits joins them """
+        habits = self.iter_habits(periodicity, page_size)
+        # the first habit decides between the report and the message for an empty list
+        first = next(habits, None)
+        if periodicity is None:
+            if first is None:
+                yield "No habits to analyze."
+                return
+            yield "Here is the list of all your habits with their name , streak & periodicity in days:"
+            yield ""
+            line = "habit: {name}, streak: {streak}, periodicity: {periodicity}"
+        else:
+            if first is None:
+                yield f"You don't have any {self.periodicity_to_text(periodicity)} habits yet - go change that!"
+                yield ""
+                return
+            yield ""
+            yield f"These are your {self.periodicity_to_text(periodicity)} habits: "
+            yield ""
+            line = "habit: {name}, streak: {streak}"
+        yield line.format(**first)
+        for habit in habits:
+            yield line.format(**habit)
+
+    @instrumented
     def show_habits_by_periodicity(self,periodicity):
         """ shows all habits with the same periodicity """
-        #reload habits from the database
-        self.load_habits_into_memory()
-        # filter all habits by periodicity and include the name as well as the streak
-        habits = [(name, habit.streak) for name, habit in self.habits.items() if habit.periodicity == periodicity]
-        #check if the dictionary "habits" is empty which would make the result "False" 
-        if not habits:
-            return(f"You don't have any {self.periodicity_to_text(periodicity)} habits yet - go change that!\n")
-        return f"\nThese are your {self.periodicity_to_text(periodicity)} habits: \n\n" + "\n".join([f"habit: {name}, streak: {streak}"  for name, streak in habits])    
-        # create a dictionary for the different periodicities 
+        # the lines are read page by page with the (periodicity, name) index
+        return "\n".join(self.report_lines(periodicity))
 
+    @instrumented
     def show_all_habits(self):
         """ shows all habits """
-        #reload habits into memory
-        self.load_habits_into_memory()
-        # store the dictionary in the variable habits
-        habits = self.get_all_habits()
-        if not habits:  # if it's true that habits is empty 
-            return "No habits to analyze.\n"
-        
-        # format the habit list into a readable string and iterate through the items of the dictionary 'habits'
-        habit_list = "\n".join([f"habit: {name}, streak: {data['streak']}, periodicity: {data['periodicity']}" for name, data in habits.items()])
-
-        return f"Here is the list of all your habits with their name , streak & periodicity in days:\n\n{habit_list}\n"
+        # the lines are read page by page in name order instead of copying every habit into a dictionary first
+        return "\n".join(self.report_lines()) + "\n"
             
+    @instrumented
+    def page_habits(self, after = None, limit = 50, order_by = "name", descending = False, periodicity = None):
+        """ returns one page of habits and the cursor of the next page, None after the last one
+            after is the cursor returned with the previous page, so every page is read with an index instead of an OFFSET
+            with a periodicity only the habits with that periodicity are paged """
+        if order_by not in PAGE_ORDERS:
+            raise ValueError(f"Habits can only be sorted by {', '.join(PAGE_ORDERS)}.")
+        # buffered check-offs would be missing from the pages
+        self.flush()
+
+        # the cursor holds the sort columns of the last row of the previous page, (name,) or (value, name)
+        columns = ("name",) if order_by == "name" else (order_by, "name")
+        direction = "DESC" if descending else "ASC"
+        conditions = []
+        params = []
+        if periodicity is not None:
+            # sorted by name, the (periodicity, name) index returns the page in order
+            conditions.append("periodicity = ?")
+            params.append(int(periodicity))
+        if after is not None:
+            # row values compare column by column like the ORDER BY
+            conditions.append(f"({', '.join(columns)}) {'<' if descending else '>'} ({', '.join('?' for column in columns)})")
+            params.extend(after)
+        params.append(limit)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        rows = self.db.execute(
+            f"SELECT name, periodicity, streak FROM habit {where} ORDER BY {', '.join(f'{column} {direction}' for column in columns)} LIMIT ?",
+            params
+        ).fetchall()
+        metrics.record_rows_read(len(rows))
+
+        habits = [{'name' : name, 'periodicity' : periodicity, 'streak' : streak} for name, periodicity, streak in rows]
+        # a page that isn't full is the last one
+        next_cursor = tuple(habits[-1][column] for column in columns) if len(rows) == limit else None
+        return {
+            'habits' : habits,
+            'next' : next_cursor
+        }
+
+    @instrumented
     def longest_streak(self):
         """ displays the longest streak of all habits """
         # iterate through the in-memory storage to work with the latest state of data
@@ -226,15 +690,35 @@ class HabitManager:
         if not self.habits:
             return None
       
-        # find the habit with the longest streak
-        # the max function finds the maximum element in a collection based on a criterion by comparing the values the lambda function returns 
-        # key = lambda habit : a function that takes a single argument (habit) and returns the longest_streak attribute of the habit object
-        longest_streak_habit = max(self.habits.values(), key = lambda habit: habit.longest_streak) 
+        # find the habit with the longest streak at the end of the ordered longest_streak index
+        name, longest_streak = self.index.top_k("longest_streak", 1)[0]
+        longest_streak_habit = self.habits[name]
         return {
             'name' : longest_streak_habit.name,
             'longest_streak' : longest_streak_habit.longest_streak
         }
     
+    def bytes_per_habit(self):
+        """ returns the average memory used by one habit in the in-memory storage, including its dictionary entry """
+        # a key that is the habit name itself is only counted once
+        if not self.habits:
+            return 0
+        total = sys.getsizeof(self.habits) + sum((sys.getsizeof(key) if key is not habit.name else 0) + habit.memory_size() for key, habit in self.habits.items())
+        return total / len(self.habits)
+
+    def analytics(self):
+        """ returns the vectorized statistics over all habits and misses, needs NumPy """
+        # imported here so the rest of the application works without NumPy
+        from analytics import HabitAnalytics
+        # the statistics are calculated from the database, so buffered changes are written first
+        self.flush()
+        return HabitAnalytics(self.db)
+
+    @instrumented
+    def top_k(self, metric, k):
+        """ returns a leaderboard of the k habits with the highest streak or longest_streak """
+        return [{'name' : self.habits[key].name, metric : value} for key, value in self.index.top_k(metric, k)]
+
     def longest_streak_for_habit(self,name):
         """ displays the longest streak for a speficic habit """
 
@@ -255,58 +739,76 @@ class HabitManager:
         """ checks if a habit exists """
         return name in self.habits
            
-    def missed_counter(self, habit_name):
-        """ counts how often a streak was reset in the past 30 days """
-        # calculate the interval of the past 30 days
-        interval_30_days = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
-        with sqlite3.connect(self.db_name) as db:
-            cur = db.cursor()
-
-            # query how many times a habit wasn't checked off in the set periodicity
-            cur.execute(
-                """ SELECT COUNT(*)
-                FROM reset_log
-                WHERE name = ?
-                AND missed_time >= ?
-            """, (habit_name,interval_30_days)
-            )
-
-            # fetch the count from the query
-            result = cur.fetchone()
-            #because fetchone always returns a tuple -> if result is None or result[0] is None
-            if result is None or result[0] is None:
-                return 0
-            
-            return result[0]
-            
-    def most_misses(self):
-        """ finds the habit with the most missed_time logs in the past 30 days """
-
+    @instrumented
+    def missed_counter(self, habit_name, days=30):
+        """ counts how often a streak was reset in the past days, 30 by default """
+        # the misses are counted per day, so the window starts at the beginning of its first day
+        first_day = day_number((datetime.now() - timedelta(days=days)).date())
+        # add up the daily miss counts of the habit inside the window
+        cur = self.db.execute(
+            """ SELECT SUM(misses)
+            FROM miss_daily
+            WHERE name = ?
+            AND day >= ?
+        """, (self.stored_name(habit_name),first_day)
+        )
+
+        # fetch the count from the query
+        result = cur.fetchone()
+        metrics.record_rows_read(1)
+        #because fetchone always returns a tuple -> if result is None or result[0] is None
+        if result is None or result[0] is None:
+            return 0
         
-        # calculate the start of the 30 day interval
-        interval_30_days = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
-
-        with sqlite3.connect(self.db_name) as db:
-            cur = db.cursor()
-
-            # query to count the missed_time logs for each habit in the last 30 days
-            cur.execute(
-                """
-                SELECT name, COUNT(*) as missed_count
-                FROM reset_log
-                WHERE missed_time >= ?
-                GROUP BY name
-                ORDER BY missed_count DESC
-                LIMIT 1
-                """, (interval_30_days,) # trailing comma is necessary because a tuple is required, otherwise it will be interpreted as a string instead of a tuple
-            )
-                        
-            # fetch the result ( habit name and the count )
-            result = cur.fetchone()
+        return result[0]
+
+    def stored_name(self, name):
+        """ returns the name a habit is stored with in the logs, the input can be written in any case """
+        # the miss tables are keyed by the stored name, a name that isn't loaded is used as it is
+        habit = self.habits.get(name.lower())
+        return habit.name if habit is not None else name
+
+    @instrumented
+    def missed_counts(self, habit_name, windows=MISS_WINDOWS):
+        """ counts the misses of a habit for several windows of days with a single query """
+        today = datetime.now()
+        first_days = [day_number((today - timedelta(days=days)).date()) for days in windows]
+        # one SUM per window over the daily counts of the longest window
+        sums = ", ".join("SUM(CASE WHEN day >= ? THEN misses ELSE 0 END)" for days in windows)
+        cur = self.db.execute(
+            f"SELECT {sums} FROM miss_daily WHERE name = ? AND day >= ?",
+            (*first_days, self.stored_name(habit_name), min(first_days))
+        )
+        result = cur.fetchone()
+        metrics.record_rows_read(1)
+        return {days: count or 0 for days, count in zip(windows, result)}
+            
+    @instrumented
+    def most_misses(self, days=30):
+        """ finds the habit with the most missed_time logs in the past days, 30 by default """
+
+        # calculate the first day of the interval
+        first_day = day_number((datetime.now() - timedelta(days=days)).date())
+
+        # query to add up the daily miss counts for each habit in the interval
+        cur = self.db.execute(
+            """
+            SELECT name, SUM(misses) as missed_count
+            FROM miss_daily
+            WHERE day >= ?
+            GROUP BY name
+            ORDER BY missed_count DESC
+            LIMIT 1
+            """, (first_day,) # trailing comma is necessary because a tuple is required, otherwise it will be interpreted as a string instead of a tuple
+        )
+                    
+        # fetch the result ( habit name and the count )
+        result = cur.fetchone()
+        metrics.record_rows_read(result is not None)
 
 
-            if result is None:
-                return "You're doing great! You've never missed one of your habits in the past 30 days -\n I'm so proud of you!\n"
+        if result is None:
+            return f"You're doing great! You've never missed one of your habits in the past {days} days -\n I'm so proud of you!\n"
         
         # unpack the result to print the value
         habit_name, missed_count = result 
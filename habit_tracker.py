@@ -0,0 +1,138 @@
+import argparse
+import sys
+from habit_manager import HabitManager
+
+# the GUI, customtkinter and APScheduler are only imported by the gui command, so the other commands start quickly
+# a command should finish its startup (interpreter, imports and loading the habits) within this many seconds
+STARTUP_TARGET = 0.15
+
+
+def add(habit_manager, args):
+    habit_manager.add_habit(args.name, args.periodicity)
+    return f"The habit '{args.name}' was successfully created with a periodicity of '{args.periodicity}'."
+
+def delete(habit_manager, args):
+    return habit_manager.delete_habit(args.name)
+
+def checkoff(habit_manager, args):
+    return habit_manager.check_off_habit(args.name)
+
+def list_habits(habit_manager, args):
+    # the lines are printed while the next pages are read, so the first habits appear at once
+    return habit_manager.report_lines(args.periodicity)
+
+def longest_streak(habit_manager, args):
+    if args.name is not None:
+        return habit_manager.longest_streak_for_habit(args.name)
+    result = habit_manager.longest_streak()
+    if result is None:
+        return "No habits found."
+    return f"Your longest streak is {result['longest_streak']} for the habit '{result['name']}'."
+
+def missed(habit_manager, args):
+    return f"The habit '{args.name}' was missed {habit_manager.missed_counter(args.name, args.days)} times in the past {args.days} days."
+
+def most_misses(habit_manager, args):
+    return habit_manager.most_misses(args.days)
+
+def reset(habit_manager, args):
+    result = habit_manager.reset_due_habits()
+    return f"reset {result['reset']} habits, {result['missed']} were missed"
+
+def catch_up(habit_manager, args):
+    result = habit_manager.catch_up_missed_periods()
+    return f"closed the periods of {result['reset']} habits, {result['missed']} periods were missed"
+
+def next_due(habit_manager, args):
+    due = habit_manager.next_due(args.count)
+    if not due:
+        return "No habits found."
+    return "\n".join(f"{entry['day']}: {entry['name']}" for entry in due)
+
+def gui(args):
+    """ starts the graphical user interface with the scheduler like running main.py """
+    import main
+    main.main(args.db, snapshot = not args.no_snapshot)
+
+def build_parser():
+    """ returns the argument parser with one subcommand per HabitManager operation """
+    parser = argparse.ArgumentParser(prog = "habit_tracker", description = "track your habits from the command line")
+    parser.add_argument("--db", default = "habit.db", help = "database file")
+    parser.add_argument("--no-snapshot", action = "store_true", help = "load the habits from the database instead of the snapshot file")
+    commands = parser.add_subparsers(dest = "command", required = True)
+
+    command = commands.add_parser("add", help = "create a new habit")
+    command.add_argument("name")
+    command.add_argument("periodicity", type = int, help = "period in days")
+    command.set_defaults(handler = add)
+
+    command = commands.add_parser("delete", help = "delete a habit")
+    command.add_argument("name")
+    command.set_defaults(handler = delete)
+
+    command = commands.add_parser("checkoff", help = "check off a habit")
+    command.add_argument("name")
+    command.set_defaults(handler = checkoff)
+
+    command = commands.add_parser("list", help = "show all habits or the habits with one periodicity")
+    command.add_argument("--periodicity", type = int)
+    command.set_defaults(handler = list_habits)
+
+    command = commands.add_parser("longest-streak", help = "show the longest streak of all habits or of one habit")
+    command.add_argument("name", nargs = "?")
+    command.set_defaults(handler = longest_streak)
+
+    command = commands.add_parser("missed", help = "count how often a habit was missed")
+    command.add_argument("name")
+    command.add_argument("--days", type = int, default = 30)
+    command.set_defaults(handler = missed)
+
+    command = commands.add_parser("most-misses", help = "show the habit that was missed most often")
+    command.add_argument("--days", type = int, default = 30)
+    command.set_defaults(handler = most_misses)
+
+    command = commands.add_parser("reset", help = "reset the habits whose period ends today, e.g. from cron at 23:59:57")
+    command.set_defaults(handler = reset)
+
+    command = commands.add_parser("catch-up", help = "close the periods that ended while the application wasn't running")
+    command.set_defaults(handler = catch_up)
+
+    command = commands.add_parser("next-due", help = "show the habits whose periods end next")
+    command.add_argument("--count", type = int, default = 5)
+    command.set_defaults(handler = next_due)
+
+    command = commands.add_parser("gui", help = "open the graphical user interface")
+    command.set_defaults(handler = None)
+
+    return parser
+
+def main(argv = None):
+    """ command line entry point, returns 1 when the command failed """
+    args = build_parser().parse_args(argv)
+    if args.command == "gui":
+        gui(args)
+        return 0
+
+    # a command that doesn't change a habit keeps the snapshot of the last run valid for the next one
+    # the same WAL profile as the GUI and the API server, so a command can run while they are open
+    habit_manager = HabitManager(args.db, profile = "balanced", snapshot = not args.no_snapshot)
+    try:
+        habit_manager.initialize_database()
+        habit_manager.load_habits_into_memory()
+        output = args.handler(habit_manager, args)
+        if isinstance(output, str):
+            print(output)
+        else:
+            for line in output:
+                print(line)
+        return 0
+    except ValueError as e:
+        # the same messages the GUI shows in its message boxes
+        print(e, file = sys.stderr)
+        return 1
+    finally:
+        # writes the buffered check-off events before the process ends
+        habit_manager.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,34 @@
 from datetime import datetime, timedelta, time
-import sqlite3
+from sys import getsizeof
+from database import ConnectionManager
+from metrics import instrumented
+from timestamps import to_epoch
 
 class Habits:
-    def __init__(self, name, periodicity, streak = 0, milestone = 0, missed_time = None, longest_streak = 0, creation_time = None, checked_off = 0, db_name = "test.db"):
+    # fixed attribute slots instead of a per-instance __dict__ keep a large number of habits small in memory
+    __slots__ = ("name", "periodicity", "streak", "milestone", "creation_time", "longest_streak", "missed_time", "checked_off", "db_name", "db")
+
+    def __init__(self, name, periodicity, streak = 0, milestone = 0, missed_time = None, longest_streak = 0, creation_time = None, checked_off = 0, db_name = "test.db", db = None):
         self.name = name
-        self.periodicity = periodicity
+        # store the periodicity as a number of days
+        self.periodicity = int(periodicity)
         self.streak = streak
         self.milestone = milestone
+        # parse the creation_time once, imported files contain it as a string
+        if isinstance(creation_time, str):
+            creation_time = datetime.fromisoformat(creation_time)
         self.creation_time = creation_time or datetime.now()
         self.longest_streak = longest_streak
         self.missed_time = missed_time
         self.checked_off = checked_off
         self.db_name = db_name
+        # connection manager shared with the HabitManager, a habit on its own opens a connection when needed
+        self.db = db
+
+    def memory_size(self):
+        """ returns the number of bytes used by the habit object and the values that belong only to it """
+        # small integers, None and the shared connection manager are not counted
+        return getsizeof(self) + getsizeof(self.name) + getsizeof(self.creation_time)
 
     def __str__(self):
         """ turns the habit objects into a readable string """
@@ -40,65 +57,61 @@ class Habits:
         # return an empty string when no milestone is reached
         return ""
 
-    def reset_checked_off(self):
-        """ Resets the checked-off status and handles updating the streak or creating a log for missed_time """
-        # convert the creation_time from a string back into a datetime object
-        if isinstance(self.creation_time, str):
-            self.creation_time = datetime.strptime(self.creation_time,"%Y-%m-%d %H:%M:%S")
+    def period_end(self):
+        """ calculates the end of the current period (creation_time + periodicity) """
 
-        
-        # calculate the end of the current period (creation_time + periodicity)
         # convert periodicity "number of days" into an integer
-        period_end = self.creation_time + timedelta(days=int(self.periodicity))
+        return self.creation_time + timedelta(days=int(self.periodicity))
+
+    @instrumented
+    def reset_checked_off(self):
+        """ Resets the checked-off status and handles updating the streak or creating a log for missed_time """
+        # calculate the end of the current period
+        period_end = self.period_end()
 
         # Get the current time
         current_time = datetime.now()
 
         # check if the current date 'current_time.date()' is equal to the period end and if the habit is not checked off
         if current_time.date() == period_end.date():
+            missed = False
             if self.checked_off == 0:
 
                 # reset the streak
                 self.streak = 0
                 self.milestone = 0
-
-                
-                with sqlite3.connect(self.db_name) as db:
-                    cur = db.cursor()
-
-                    #log the missed time
-                    cur.execute(
-                        """
-                        INSERT INTO reset_log (name, missed_time)
-                        VALUES (?,?)
-                        """, (self.name, current_time.strftime('%Y-%m-%d %H:%M:%S'))
-                    )
-                    
-
-                    # update the creation_time to correctly calculate the next period end
-                    cur.execute(
-                        """UPDATE habit
-                        SET creation_time = ?, streak = ?, milestone = ? 
-                        WHERE name = ?""", (period_end.strftime('%Y-%m-%d %H:%M:%S'), self.streak, self.milestone, self.name)
-                    )
-
-                    db.commit()
+                missed = True
 
             # if the habit has been checked off :
             elif self.checked_off == 1:
                 # reset the check off so the habit can be checked off in the new period
                 self.checked_off = 0
 
-            # update the check_off value and creation_time to correctly calculate the next period end
-            with sqlite3.connect(self.db_name) as db:
-                cur = db.cursor()
-                cur.execute(
-                    """
-                    UPDATE habit
-                    SET creation_time = ?, checked_off = ?
-                    WHERE name = ?""", (period_end.strftime('%Y-%m-%d %H:%M:%S'), self.checked_off, self.name)
-                )
-                db.commit()
+            # use the shared connections of the HabitManager, a standalone habit opens its own connection
+            db = self.db if self.db is not None else ConnectionManager(self.db_name)
+            try:
+                # the missed log and the habit update are committed together
+                with db.transaction() as conn:
+                    if missed:
+                        #log the missed time
+                        conn.execute(
+                            """
+                            INSERT INTO reset_log (name, missed_time, utc_offset)
+                            VALUES (?,?,?)
+                            """, (self.name, *to_epoch(current_time))
+                        )
+
+                    # update the check_off value, streak and creation_time to correctly calculate the next period end
+                    # the habit is found by its lowercase name with the unique name_key index
+                    conn.execute(
+                        """
+                        UPDATE habit
+                        SET creation_time = ?, utc_offset = ?, checked_off = ?, streak = ?, milestone = ?
+                        WHERE name_key = ?""", (*to_epoch(period_end), self.checked_off, self.streak, self.milestone, self.name.lower())
+                    )
+            finally:
+                if db is not self.db:
+                    db.close()
 
 
     
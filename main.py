@@ -1,18 +1,54 @@
-from apscheduler.schedulers.background import BackgroundScheduler
+from datetime import datetime
 from habit_manager import HabitManager          #imports the logic for habit management
-from GUI import HabitGUI  #imports the GUI
-import customtkinter as ctk
 
 
 def scheduled_reset(habit_manager):
     """ function that resets all habits at the end of the day """
-    for habit in habit_manager.habits.values():
-        habit.reset_checked_off()
+    # reset every due habit in one bulk operation and report the number of rows and the duration
+    return habit_manager.reset_due_habits()
 
-def main():
+def schedule_next_reset(scheduler, habit_manager, worker = None, on_error = None):
+    """ sets the reset job to the end of the day on which the next habit is due, instead of running it every night
+        with the worker of the GUI the reset runs on its thread, on_error is called with a failed reset on the Tk thread """
+    next_reset = habit_manager.next_reset_time()
+    if next_reset is None:
+        # without habits there is nothing to reset until one is added
+        if scheduler.get_job("reset") is not None:
+            scheduler.remove_job("reset")
+        return None
+    # a habit that was due on an earlier day is reset right away
+    run_date = max(next_reset, datetime.now())
+    # the job is the only one until the next reset, so it must not be dropped when it couldn't run on time,
+    # e.g. while the computer was asleep, it runs as soon as possible instead
+    scheduler.add_job(
+        start_reset, 'date', run_date = run_date, args = [scheduler, habit_manager, worker, on_error], id = "reset", replace_existing = True,
+        misfire_grace_time = None, coalesce = True
+    )
+    return run_date
+
+def start_reset(scheduler, habit_manager, worker = None, on_error = None):
+    """ scheduler job that hands the reset to the worker of the GUI, so it never changes the habits at the same time as a GUI request """
+    if worker is None:
+        return reset_and_reschedule(scheduler, habit_manager)
+    worker.submit(reset_and_reschedule, scheduler, habit_manager, worker, on_error, on_error = on_error)
+
+def reset_and_reschedule(scheduler, habit_manager, worker = None, on_error = None):
+    """ runs the reset of the due habits and schedules the job for the next due habit """
+    try:
+        return scheduled_reset(habit_manager)
+    finally:
+        schedule_next_reset(scheduler, habit_manager, worker, on_error)
+
+def main(db_name = "habit.db", snapshot = True):
+    # the GUI, customtkinter and APScheduler take most of the startup time, so they are only imported when the GUI starts
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from GUI import HabitGUI  #imports the GUI
+    import customtkinter as ctk
 
     # initialize the backend with the db_name specified, either test.db for testing or habit.db for the actual program
-    habit_manager = HabitManager("habit.db")
+    # the balanced profile uses WAL, so the reset thread of the scheduler doesn't block the GUI
+    # the snapshot written when the GUI is closed lets the next start skip reading the habit table
+    habit_manager = HabitManager(db_name, profile = "balanced", snapshot = snapshot)
 
     # initialize the database
     habit_manager.initialize_database()
@@ -20,6 +56,9 @@ def main():
     # load all habits into the memory
     habit_manager.load_habits_into_memory()
 
+    # close the periods that ended while the application wasn't running
+    habit_manager.catch_up_missed_periods()
+
     # create the main application window
     root = ctk.CTk()
 
@@ -28,15 +67,26 @@ def main():
 
     # setting up the scheduler
     scheduler = BackgroundScheduler()
-    scheduler.add_job(scheduled_reset, 'cron', hour = 23, minute = 59, second = 57, args = [habit_manager])
     scheduler.start()
+    # the reset job runs when the next habit is due and is moved whenever an added habit is due earlier
+    schedule_next_reset(scheduler, habit_manager, app.worker, app.show_error)
+    habit_manager.due_listener = lambda: schedule_next_reset(scheduler, habit_manager, app.worker, app.show_error)
 
     try:
         # start the TKinter event loop
         # this blocks every other code from running until the GUI is closed
         root.mainloop()
     except KeyboardInterrupt:
+        pass
+    finally:
+        # no reset may start on the closed worker or after the snapshot is written
         scheduler.shutdown()
+        try:
+            # finish the requests the GUI still has queued before the connections are closed
+            app.close()
+        finally:
+            # close the pooled database connections, even if the GUI failed to close
+            habit_manager.close()
 
 if __name__ == "__main__":
    
@@ -0,0 +1,174 @@
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+
+
+class Metrics:
+    """ collects call counts, latency histograms, rows and commits per operation """
+
+    # upper bounds of the latency histogram buckets in seconds
+    buckets = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        # instrumented functions skip all bookkeeping while this is False
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.operations = {}
+        # name of the operation that is currently running on each thread, rows and commits are counted for it
+        self.current = threading.local()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """ forgets all collected values """
+        with self.lock:
+            self.operations = {}
+
+    def operation(self, name):
+        """ returns the counters of an operation and creates them on first use, the caller holds the lock """
+        counters = self.operations.get(name)
+        if counters is None:
+            counters = self.operations[name] = {
+                "calls" : 0,
+                "errors" : 0,
+                "seconds" : 0.0,
+                # one count per bucket plus one for the calls slower than the last bucket
+                "histogram" : [0] * (len(self.buckets) + 1),
+                "rows_read" : 0,
+                "rows_written" : 0,
+                "commits" : 0
+            }
+        return counters
+
+    def record_call(self, name, seconds, failed = False):
+        """ adds one call of an operation with its duration """
+        with self.lock:
+            counters = self.operation(name)
+            counters["calls"] += 1
+            counters["errors"] += failed
+            counters["seconds"] += seconds
+            counters["histogram"][bisect_left(self.buckets, seconds)] += 1
+
+    def current_operation(self):
+        """ returns the innermost instrumented operation running on the calling thread """
+        stack = getattr(self.current, "stack", None)
+        return stack[-1] if stack else "other"
+
+    def record_rows_read(self, rows):
+        """ adds rows read by the running operation """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.operation(self.current_operation())["rows_read"] += rows
+
+    def record_commit(self, rows_written):
+        """ adds a commit and the rows it changed to the running operation """
+        if not self.enabled:
+            return
+        with self.lock:
+            counters = self.operation(self.current_operation())
+            counters["commits"] += 1
+            counters["rows_written"] += rows_written
+
+    def as_dict(self):
+        """ returns a copy of all counters, with the histogram as cumulative counts per upper bound """
+        with self.lock:
+            result = {}
+            for name, counters in self.operations.items():
+                snapshot = dict(counters)
+                cumulative = 0
+                snapshot["histogram"] = {}
+                for bound, count in zip(self.buckets + (float("inf"),), counters["histogram"]):
+                    cumulative += count
+                    snapshot["histogram"][bound] = cumulative
+                result[name] = snapshot
+            return result
+
+    def prometheus(self):
+        """ returns all counters in the Prometheus text exposition format """
+        operations = self.as_dict()
+        lines = [
+            "# HELP habit_tracker_operation_seconds duration of the HabitManager operations",
+            "# TYPE habit_tracker_operation_seconds histogram"
+        ]
+        for name, counters in operations.items():
+            for bound, count in counters["histogram"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'habit_tracker_operation_seconds_bucket{{operation="{name}",le="{le}"}} {count}')
+            lines.append(f'habit_tracker_operation_seconds_sum{{operation="{name}"}} {counters["seconds"]}')
+            lines.append(f'habit_tracker_operation_seconds_count{{operation="{name}"}} {counters["calls"]}')
+
+        for counter, description in [("errors", "calls that raised an exception"), ("rows_read", "rows read from the database"), ("rows_written", "rows changed in the database"), ("commits", "committed transactions")]:
+            lines.append(f"# HELP habit_tracker_{counter}_total {description}")
+            lines.append(f"# TYPE habit_tracker_{counter}_total counter")
+            for name, counters in operations.items():
+                lines.append(f'habit_tracker_{counter}_total{{operation="{name}"}} {counters[counter]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """ writes the Prometheus text to a file, e.g. for the textfile collector of the node exporter """
+        with open(path, "w") as file:
+            file.write(self.prometheus())
+
+    def serve(self, port = 9464, host = "127.0.0.1"):
+        """ serves the Prometheus text on http://host:port/metrics from a background thread and returns the server """
+        # imported here because http.server is slow to import and only needed when the metrics are served
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # keep the terminal free from access logs
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target = server.serve_forever, name = "metrics-server", daemon = True).start()
+        return server
+
+
+# registry shared by the whole application, disabled until metrics.enable() is called
+metrics = Metrics()
+
+
+def instrumented(function):
+    """ decorator that records calls, latency, rows and commits of a function under its name """
+    name = function.__name__
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        # a single attribute check is all the overhead while the metrics are disabled
+        if not metrics.enabled:
+            return function(*args, **kwargs)
+
+        stack = getattr(metrics.current, "stack", None)
+        if stack is None:
+            stack = metrics.current.stack = []
+        stack.append(name)
+        start = perf_counter()
+        failed = True
+        try:
+            result = function(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            stack.pop()
+            metrics.record_call(name, perf_counter() - start, failed)
+
+    return wrapper
@@ -0,0 +1,307 @@
+# ordered schema upgrades of the habit database
+# the schema version is stored in PRAGMA user_version, version n means that the first n steps of MIGRATIONS have been applied
+# new steps are only ever appended to the end of the list so existing databases upgrade in place
+
+
+def create_tables(db):
+    """ creates the habit and reset_log table if they don't exist in the database """
+    # this creates the table that stores the habit details
+    db.execute("""
+                CREATE TABLE IF NOT EXISTS habit(name TEXT PRIMARY KEY,
+                periodicity INTEGER NOT NULL,
+                streak INTEGER DEFAULT 0,
+                longest_streak INTEGER DEFAULT 0,
+                checked_off INTEGER DEFAULT 0, 
+                creation_time TEXT,
+                milestone INTEGER DEFAULT 0
+                 )""")
+    # this creates the table that stores the dates when a habit was missed to be checked off in time 
+    # id as primary key, so 'name' can appear multiple times inside the table      
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS reset_log(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        missed_time TEXT DEFAULT NULL,
+        FOREIGN KEY (name) REFERENCES habit (name))"""
+    )
+
+def add_lookup_indexes(db):
+    """ adds the indexes for the per-habit miss queries and the case-insensitive name lookups """
+    # missed_counter and most_misses filter the reset_log on name and missed_time
+    db.execute("CREATE INDEX IF NOT EXISTS idx_reset_log_name_missed_time ON reset_log (name, missed_time)")
+    # delete_habit looks habits up by their lowercase name
+    db.execute("CREATE INDEX IF NOT EXISTS idx_habit_lower_name ON habit (LOWER(name))")
+
+def create_checkoff_log(db):
+    """ creates the append-only table that records every check-off """
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS checkoff_log(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        checked_off_time TEXT,
+        streak INTEGER,
+        FOREIGN KEY (name) REFERENCES habit (name))"""
+    )
+    # completion rates are calculated per habit over a time window
+    db.execute("CREATE INDEX IF NOT EXISTS idx_checkoff_log_name_time ON checkoff_log (name, checked_off_time)")
+
+def create_miss_daily(db):
+    """ creates the per-habit, per-day miss counts that are kept up to date by triggers on the reset_log """
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS miss_daily(
+        name TEXT,
+        day TEXT,
+        misses INTEGER NOT NULL,
+        PRIMARY KEY (name, day)) WITHOUT ROWID"""
+    )
+    # most_misses sums up all habits over a range of days
+    db.execute("CREATE INDEX IF NOT EXISTS idx_miss_daily_day ON miss_daily (day, name)")
+
+    # count the misses that are already logged
+    db.execute("DELETE FROM miss_daily")
+    db.execute(
+        """
+        INSERT INTO miss_daily (name, day, misses)
+        SELECT name, date(missed_time), COUNT(*)
+        FROM reset_log
+        WHERE missed_time IS NOT NULL
+        GROUP BY name, date(missed_time)"""
+    )
+
+    # every logged miss increments the count of its day, a deleted log entry decrements it
+    db.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS reset_log_count_miss AFTER INSERT ON reset_log
+        WHEN NEW.missed_time IS NOT NULL
+        BEGIN
+            INSERT INTO miss_daily (name, day, misses) VALUES (NEW.name, date(NEW.missed_time), 1)
+            ON CONFLICT (name, day) DO UPDATE SET misses = misses + 1;
+        END"""
+    )
+    db.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS reset_log_uncount_miss AFTER DELETE ON reset_log
+        WHEN OLD.missed_time IS NOT NULL
+        BEGIN
+            UPDATE miss_daily SET misses = misses - 1 WHERE name = OLD.name AND day = date(OLD.missed_time);
+            DELETE FROM miss_daily WHERE name = OLD.name AND day = date(OLD.missed_time) AND misses <= 0;
+        END"""
+    )
+
+def add_page_indexes(db):
+    """ adds the indexes that let page_habits read one page of habits in streak or periodicity order """
+    # the name makes every position in the order unique, so a page can start right after the last row of the previous one
+    db.execute("CREATE INDEX IF NOT EXISTS idx_habit_streak_name ON habit (streak, name)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_habit_periodicity_name ON habit (periodicity, name)")
+
+def add_name_key(db):
+    """ adds the lowercase name_key column that every per-habit statement looks habits up by """
+    db.execute("ALTER TABLE habit ADD COLUMN name_key TEXT")
+
+    # the key is filled with str.lower like the keys of the in-memory habits, SQLite's LOWER only folds ASCII letters
+    # names that only differed in case could be stored before, all but the oldest of them get their rowid appended
+    keys = set()
+    for rowid, name in db.execute("SELECT rowid, name FROM habit ORDER BY rowid").fetchall():
+        if name.lower() in keys:
+            new_name = f"{name} ({rowid})"
+            db.execute("UPDATE habit SET name = ? WHERE rowid = ?", (new_name, rowid))
+            for table in ("reset_log", "checkoff_log", "miss_daily"):
+                db.execute(f"UPDATE {table} SET name = ? WHERE name = ?", (new_name, name))
+            name = new_name
+        keys.add(name.lower())
+        db.execute("UPDATE habit SET name_key = ? WHERE rowid = ?", (name.lower(), rowid))
+
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_habit_name_key ON habit (name_key)")
+    # replaced by the name_key index
+    db.execute("DROP INDEX IF EXISTS idx_habit_lower_name")
+    # rows inserted by other tools without a key get the SQL lowercase name
+    db.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS habit_fill_name_key AFTER INSERT ON habit
+        WHEN NEW.name_key IS NULL
+        BEGIN
+            UPDATE habit SET name_key = LOWER(NEW.name) WHERE rowid = NEW.rowid;
+        END"""
+    )
+
+# SQL expressions that convert a '%Y-%m-%d %H:%M:%S' local time into epoch seconds and into the UTC offset of that moment
+# SQLite's 'utc' modifier uses the local time zone of the process like Python's datetime.astimezone
+EPOCH_SECONDS = "CAST(strftime('%s', {0}, 'utc') AS INTEGER)"
+UTC_OFFSET = "CAST(strftime('%s', {0}) AS INTEGER) - CAST(strftime('%s', {0}, 'utc') AS INTEGER)"
+# local day of a stored time as days since 1970-01-01
+LOCAL_DAY = "({0} + IFNULL({1}, 0)) / 86400"
+
+def store_epoch_times(db):
+    """ converts the TEXT times of habit, reset_log and checkoff_log into integer epoch seconds with their UTC offset """
+    # SQLite can't change the type of a column, so every table is copied into a new one with INTEGER times
+    db.execute(
+        """
+        CREATE TABLE habit_new(name TEXT PRIMARY KEY,
+        periodicity INTEGER NOT NULL,
+        streak INTEGER DEFAULT 0,
+        longest_streak INTEGER DEFAULT 0,
+        checked_off INTEGER DEFAULT 0,
+        creation_time INTEGER,
+        milestone INTEGER DEFAULT 0,
+        name_key TEXT,
+        utc_offset INTEGER)"""
+    )
+    db.execute(
+        f"""
+        INSERT INTO habit_new
+        SELECT name, periodicity, streak, longest_streak, checked_off, {EPOCH_SECONDS.format("creation_time")}, milestone, name_key, {UTC_OFFSET.format("creation_time")}
+        FROM habit"""
+    )
+    db.execute("DROP TABLE habit")
+    db.execute("ALTER TABLE habit_new RENAME TO habit")
+    # the indexes and triggers were dropped with the old table
+    db.execute("CREATE UNIQUE INDEX idx_habit_name_key ON habit (name_key)")
+    db.execute("CREATE INDEX idx_habit_streak_name ON habit (streak, name)")
+    db.execute("CREATE INDEX idx_habit_periodicity_name ON habit (periodicity, name)")
+    db.execute(
+        """
+        CREATE TRIGGER habit_fill_name_key AFTER INSERT ON habit
+        WHEN NEW.name_key IS NULL
+        BEGIN
+            UPDATE habit SET name_key = LOWER(NEW.name) WHERE rowid = NEW.rowid;
+        END"""
+    )
+
+    db.execute(
+        """
+        CREATE TABLE reset_log_new(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        missed_time INTEGER DEFAULT NULL,
+        utc_offset INTEGER,
+        FOREIGN KEY (name) REFERENCES habit (name))"""
+    )
+    db.execute(f"INSERT INTO reset_log_new SELECT id, name, {EPOCH_SECONDS.format('missed_time')}, {UTC_OFFSET.format('missed_time')} FROM reset_log")
+    db.execute("DROP TABLE reset_log")
+    db.execute("ALTER TABLE reset_log_new RENAME TO reset_log")
+    db.execute("CREATE INDEX idx_reset_log_name_missed_time ON reset_log (name, missed_time)")
+
+    db.execute(
+        """
+        CREATE TABLE checkoff_log_new(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        checked_off_time INTEGER,
+        utc_offset INTEGER,
+        streak INTEGER,
+        FOREIGN KEY (name) REFERENCES habit (name))"""
+    )
+    db.execute(f"INSERT INTO checkoff_log_new SELECT id, name, {EPOCH_SECONDS.format('checked_off_time')}, {UTC_OFFSET.format('checked_off_time')}, streak FROM checkoff_log")
+    db.execute("DROP TABLE checkoff_log")
+    db.execute("ALTER TABLE checkoff_log_new RENAME TO checkoff_log")
+    db.execute("CREATE INDEX idx_checkoff_log_name_time ON checkoff_log (name, checked_off_time)")
+
+    # the daily miss counts are keyed by the local day as an integer
+    db.execute("DROP TABLE miss_daily")
+    db.execute(
+        """
+        CREATE TABLE miss_daily(
+        name TEXT,
+        day INTEGER,
+        misses INTEGER NOT NULL,
+        PRIMARY KEY (name, day)) WITHOUT ROWID"""
+    )
+    db.execute("CREATE INDEX idx_miss_daily_day ON miss_daily (day, name)")
+    db.execute(
+        f"""
+        INSERT INTO miss_daily (name, day, misses)
+        SELECT name, {LOCAL_DAY.format("missed_time", "utc_offset")}, COUNT(*)
+        FROM reset_log
+        WHERE missed_time IS NOT NULL
+        GROUP BY 1, 2"""
+    )
+    db.execute(
+        f"""
+        CREATE TRIGGER reset_log_count_miss AFTER INSERT ON reset_log
+        WHEN typeof(NEW.missed_time) = 'integer'
+        BEGIN
+            INSERT INTO miss_daily (name, day, misses) VALUES (NEW.name, {LOCAL_DAY.format("NEW.missed_time", "NEW.utc_offset")}, 1)
+            ON CONFLICT (name, day) DO UPDATE SET misses = misses + 1;
+        END"""
+    )
+    db.execute(
+        f"""
+        CREATE TRIGGER reset_log_uncount_miss AFTER DELETE ON reset_log
+        WHEN OLD.missed_time IS NOT NULL
+        BEGIN
+            UPDATE miss_daily SET misses = misses - 1 WHERE name = OLD.name AND day = {LOCAL_DAY.format("OLD.missed_time", "OLD.utc_offset")};
+            DELETE FROM miss_daily WHERE name = OLD.name AND day = {LOCAL_DAY.format("OLD.missed_time", "OLD.utc_offset")} AND misses <= 0;
+        END"""
+    )
+
+    # rows inserted by other tools with a TEXT time are converted like the existing ones
+    db.execute(
+        f"""
+        CREATE TRIGGER habit_epoch_time AFTER INSERT ON habit
+        WHEN typeof(NEW.creation_time) = 'text'
+        BEGIN
+            UPDATE habit SET creation_time = {EPOCH_SECONDS.format("NEW.creation_time")}, utc_offset = {UTC_OFFSET.format("NEW.creation_time")}
+            WHERE rowid = NEW.rowid;
+        END"""
+    )
+    db.execute(
+        f"""
+        CREATE TRIGGER reset_log_epoch_time AFTER INSERT ON reset_log
+        WHEN typeof(NEW.missed_time) = 'text'
+        BEGIN
+            UPDATE reset_log SET missed_time = {EPOCH_SECONDS.format("NEW.missed_time")}, utc_offset = {UTC_OFFSET.format("NEW.missed_time")}
+            WHERE id = NEW.id;
+            INSERT INTO miss_daily (name, day, misses) VALUES (NEW.name, CAST(strftime('%s', date(NEW.missed_time)) AS INTEGER) / 86400, 1)
+            ON CONFLICT (name, day) DO UPDATE SET misses = misses + 1;
+        END"""
+    )
+
+def add_change_counter(db):
+    """ adds a counter of the changes to the habit table, the binary snapshot of the habits is only valid at the counter it was written with """
+    # PRAGMA data_version only compares within one connection, the counter is stored in the file and seen by every process
+    db.execute("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('habit_changes', 0)")
+    # the triggers also count the changes of other tools that write into the database
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        db.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS habit_count_{event.lower()} AFTER {event} ON habit
+            BEGIN
+                UPDATE meta SET value = value + 1 WHERE key = 'habit_changes';
+            END"""
+        )
+
+
+MIGRATIONS = [
+    create_tables,
+    add_lookup_indexes,
+    create_checkoff_log,
+    create_miss_daily,
+    add_page_indexes,
+    add_name_key,
+    store_epoch_times,
+    add_change_counter,
+]
+
+
+def schema_version(db):
+    """ returns the schema version stored in the database file """
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+def habit_changes(db):
+    """ returns the number of changes made to the habit table since the counter was added """
+    return db.execute("SELECT value FROM meta WHERE key = 'habit_changes'").fetchone()[0]
+
+def migrate(db):
+    """ applies all migration steps the database is missing and returns the new schema version """
+    with db.transaction() as conn:
+        version = schema_version(conn)
+        # only run the steps after the stored version, in their listed order
+        for version, step in enumerate(MIGRATIONS[version:], start = version + 1):
+            step(conn)
+            # PRAGMA doesn't accept parameters, version is always an integer
+            conn.execute(f"PRAGMA user_version = {version}")
+    return version
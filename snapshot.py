@@ -0,0 +1,77 @@
+import mmap
+import os
+import struct
+from datetime import timedelta
+from timestamps import EPOCH
+
+# binary copy of the in-memory habits, read back with mmap instead of querying and converting every row
+# layout: header, one fixed-width record per habit in the order of the habits dictionary, then the names and keys as one UTF-8 text
+# the names and keys are separated by NUL characters, so the whole text is split with one call
+MAGIC = b"HABITSNP"
+FORMAT_VERSION = 1
+# magic, format version, schema version, change counter of the habit table, number of habits, size of the names in bytes
+HEADER = struct.Struct("<8sIIqQQ")
+# local creation time in seconds since 1970, due day ordinal, periodicity, streak, longest streak, milestone, checked off
+RECORD = struct.Struct("<qiiiiiB")
+SEPARATOR = "\0"
+ONE_SECOND = timedelta(seconds = 1)
+
+
+def snapshot_path(db_name):
+    """ returns the snapshot file that belongs to a database file, None for an in-memory database """
+    if db_name == ":memory:" or db_name.startswith("file::memory:"):
+        return None
+    return f"{db_name}.snapshot"
+
+def write_snapshot(path, habits, due, schema_version, changes):
+    """ writes the habits and the due day of every habit, the header records the state of the database they match
+        the file is written next to the old one and replaces it at once, so a crash never leaves half a snapshot """
+    records = bytearray()
+    names = []
+    for key, habit in habits.items():
+        # the wall-clock time is stored, whole seconds like the creation_time column
+        records += RECORD.pack(
+            (habit.creation_time - EPOCH) // ONE_SECOND, due[key], int(habit.periodicity), habit.streak,
+            habit.longest_streak, habit.milestone, habit.checked_off
+        )
+        names.append(habit.name)
+        names.append(key)
+    # surrogatepass keeps names that can't be encoded as regular UTF-8 readable
+    text = SEPARATOR.join(names).encode("utf-8", "surrogatepass")
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, schema_version, changes, len(habits), len(text)))
+        file.write(records)
+        file.write(text)
+    os.replace(temporary_path, path)
+
+def read_snapshot(path, schema_version, changes):
+    """ returns an iterator over the (key, name, creation_time, due day, periodicity, streak, longest_streak, milestone, checked_off)
+        rows of a snapshot, or None when there is no snapshot or it doesn't match the schema version and change counter """
+    try:
+        with open(path, "rb") as file:
+            # an empty file can't be mapped
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                return None
+            with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as data:
+                magic, format_version, snapshot_schema, snapshot_changes, count, text_size = HEADER.unpack_from(data)
+                if (magic, format_version, snapshot_schema, snapshot_changes) != (MAGIC, FORMAT_VERSION, schema_version, changes):
+                    return None
+                records_end = HEADER.size + count * RECORD.size
+                if len(data) != records_end + text_size:
+                    return None
+                names = data[records_end:].decode("utf-8", "surrogatepass").split(SEPARATOR) if count else []
+                # a name with a NUL character in it would shift all following names
+                if len(names) != 2 * count:
+                    return None
+                # slicing the map copies the records at once, a view into it would keep the map from being closed
+                records = RECORD.iter_unpack(data[HEADER.size:records_end])
+    except (OSError, ValueError, struct.error):
+        # a missing, unreadable or damaged snapshot is replaced by loading the habits from the database
+        return None
+    # the rows are created one by one while the caller builds the habits, so they never all exist at once
+    return (
+        (key, name, EPOCH + timedelta(seconds = seconds), day, periodicity, streak, longest_streak, milestone, checked_off)
+        for name, key, (seconds, day, periodicity, streak, longest_streak, milestone, checked_off) in zip(names[::2], names[1::2], records)
+    )
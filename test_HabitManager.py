@@ -3,6 +3,7 @@ import pytest
 from datetime import datetime, timedelta, time
 from habit_manager import HabitManager
 from habits import Habits
+from timestamps import from_epoch, to_epoch
 import sqlite3
 from unittest.mock import patch
 
@@ -127,9 +128,9 @@ class TestHabitManager:
         hm.db_name = "test.db"
         hm.load_habits_into_memory()
 
-        # assert : verify that habit was loaded into memory 
-        assert "Yoga" in hm.habits 
-        yoga = hm.habits["Yoga"]
+        # assert : verify that habit was loaded into memory under its lowercase name
+        assert "yoga" in hm.habits 
+        yoga = hm.habits["yoga"]
         assert yoga.name == "Yoga"
         assert yoga.streak == 2
 
@@ -179,8 +180,15 @@ class TestHabitManager:
         try: 
             hm.add_habit(test_habit1.name, test_habit1.periodicity)
         except ValueError as e:
-            assert str(e) == f"You already have a habit with the name '{test_habit1.name}'. \nPlease choose another name for the habit you want to add.\n" 
-    
+            assert str(e) == f"You already have a habit with the name '{test_habit1.name}'. \nPlease choose another name for the habit you want to add.\n"
+
+        # check if a periodicity of zero or fewer days is rejected and nothing is stored
+        for periodicity in (0, -3, "0"):
+            with pytest.raises(ValueError):
+                hm.add_habit("never ends", periodicity)
+        assert "never ends" not in hm.habits
+        assert cur.execute("SELECT COUNT(*) FROM habit WHERE name_key = 'never ends'").fetchone()[0] == 0
+
     def test_delete_habit(self, db_connection, hm, test_habit1, clear_db ):
         """ testing if the habit gets deleted from the in-memory storage and database """
 
@@ -296,7 +304,7 @@ class TestHabitManager:
         assert hm.periodicity_to_text(periodicity) == expected
 
     @pytest.mark.parametrize("periodicity, expected_message", [
-        (1,"\nThese are your daily habits: \n\nhabit: gym, streak: 9\nhabit: drink 2l water, streak: 28"),
+        (1,"\nThese are your daily habits: \n\nhabit: drink 2l water, streak: 28\nhabit: gym, streak: 9"),
         # test if client wants to add functions of showing habits more detailed
         (3,"\nThese are your every-3-day habits: \n\nhabit: cardio, streak: 7"),
         (7,"\nThese are your weekly habits: \n\nhabit: visit grandma, streak: 4"),
@@ -386,14 +394,14 @@ class TestHabitManager:
         # load habits from the database
         hm.load_habits_into_memory()
 
-        # create the expected output
+        # create the expected output, the habits are listed in name order
         expected_output = (
             "Here is the list of all your habits with their name , streak & periodicity in days:\n\n"
-            f"habit: {test_habit1.name}, streak: {test_habit1.streak}, periodicity: {test_habit1.periodicity}\n"
             f"habit: {test_habit2.name}, streak: {test_habit2.streak}, periodicity: {test_habit2.periodicity}\n"
-            f"habit: {test_habit3.name}, streak: {test_habit3.streak}, periodicity: {test_habit3.periodicity}\n"
-            f"habit: {test_habit4.name}, streak: {test_habit4.streak}, periodicity: {test_habit4.periodicity}\n"
             f"habit: {test_habit5.name}, streak: {test_habit5.streak}, periodicity: {test_habit5.periodicity}\n"
+            f"habit: {test_habit4.name}, streak: {test_habit4.streak}, periodicity: {test_habit4.periodicity}\n"
+            f"habit: {test_habit1.name}, streak: {test_habit1.streak}, periodicity: {test_habit1.periodicity}\n"
+            f"habit: {test_habit3.name}, streak: {test_habit3.streak}, periodicity: {test_habit3.periodicity}\n"
         )
 
         # assert that the returned output matches the expected output
@@ -611,3 +619,344 @@ class TestHabitManager:
             assert result == f"The habit you struggled the most with was '{test_habit4.name}' with '4' missed times.\n"
 
 
+
+    def test_loaded_habits_share_connections(self, db_connection, clear_db, hm):
+        """ testing if the habits loaded by the HabitManager reuse its connection manager """
+        hm.add_habit("reading", 1)
+        hm.load_habits_into_memory()
+
+        assert hm.habits["reading"].db is hm.db
+        assert hm.habits["reading"].db_name == "test.db"
+
+    def test_reset_due_habits(self, db_connection, clear_db, hm):
+        """ testing if reset_due_habits resets all due habits in the database and in memory """
+        # unpack the tuple of connection and cursor
+        conn, cur = db_connection
+
+        hm.add_habit("gym", 1)
+        hm.add_habit("cardio", 1)
+        hm.add_habit("clean windows", 28)
+        hm.check_off_habit("cardio")
+
+        # move the daily habits one day into the past so their period ends today
+        yesterday = datetime.now() - timedelta(days=1)
+        hm.habits["gym"].creation_time = yesterday
+        hm.habits["cardio"].creation_time = yesterday
+        # habits changed outside of the manager have to be put back into the due queue
+        hm.schedule_reset("gym")
+        hm.schedule_reset("cardio")
+
+        result = hm.reset_due_habits()
+
+        assert result["reset"] == 2
+        assert result["missed"] == 1
+        assert result["duration"] >= 0
+
+        # only the habit that wasn't checked off is logged as missed
+        cur.execute("SELECT name FROM reset_log")
+        assert cur.fetchall() == [("gym",)]
+
+        cur.execute("SELECT checked_off, streak, creation_time FROM habit WHERE name = ?", ("cardio",))
+        checked_off, streak, creation_time = cur.fetchone()
+        assert checked_off == 0
+        assert streak == 1
+        # the next period starts when the old one ended, stored as epoch seconds
+        assert creation_time == to_epoch(yesterday + timedelta(days=1))[0]
+
+        # the in-memory habits are patched to match the database
+        assert hm.habits["cardio"].checked_off == 0
+        assert hm.habits["cardio"].streak == 1
+        assert hm.habits["gym"].streak == 0
+        assert hm.habits["gym"].creation_time.date() == datetime.now().date()
+        assert hm.habits["clean windows"].creation_time.date() == datetime.now().date()
+
+    def test_failed_reset_stays_due(self, db_connection, clear_db, hm):
+        """ testing if the due habits are reset with the next call when the reset transaction fails """
+        hm.add_habit("gym", 1)
+        hm.habits["gym"].creation_time = datetime.now() - timedelta(days=1)
+        hm.schedule_reset("gym")
+
+        # another program holds the lock of the database
+        with patch.object(hm.db, "transaction", side_effect = sqlite3.OperationalError("database is locked")):
+            with pytest.raises(sqlite3.OperationalError):
+                hm.reset_due_habits()
+
+        assert [entry['name'] for entry in hm.next_due()] == ["gym"]
+        assert hm.next_reset_time() is not None
+        assert hm.reset_due_habits()["reset"] == 1
+        assert hm.habits["gym"].creation_time.date() == datetime.now().date()
+
+    def test_refresh_habits(self, db_connection, clear_db, hm):
+        """ testing if refresh_habits only reloads the habits after another connection changed the database """
+        # unpack the tuple of connection and cursor
+        conn, cur = db_connection
+
+        # adding a habit loads the habits first, so they are already up to date
+        hm.add_habit("gym", 1)
+        assert hm.refresh_habits() is False
+        gym = hm.habits["gym"]
+
+        # changes made through the manager don't require a reload
+        hm.check_off_habit("gym")
+        assert hm.refresh_habits() is False
+        assert hm.habits["gym"] is gym
+
+        # a change from another connection is in the next report, which reads the database, and the habits in memory are reloaded
+        cur.execute("INSERT INTO habit (name, periodicity, creation_time) VALUES (?,?,?)", ("yoga", 2, "2025-02-01 10:00:00"))
+        conn.commit()
+
+        assert "habit: yoga" in hm.show_all_habits()
+        assert hm.refresh_habits() is True
+        assert hm.habit_exists("yoga")
+
+    def test_top_k(self, db_connection, clear_db, hm):
+        """ testing if top_k returns a leaderboard that follows check-offs and deletes """
+        hm.add_habit("gym", 1)
+        hm.add_habit("cardio", 3)
+        hm.add_habit("yoga", 7)
+        hm.check_off_habit("cardio")
+
+        assert hm.top_k("streak", 1) == [{'name' : "cardio", 'streak' : 1}]
+        assert hm.show_habits_by_periodicity(7) == "\nThese are your weekly habits: \n\nhabit: yoga, streak: 0"
+
+        hm.delete_habit("cardio")
+        assert [entry['name'] for entry in hm.top_k("longest_streak", 5)] == ["yoga", "gym"]
+        assert hm.show_habits_by_periodicity(3) == "You don't have any every-3-day habits yet - go change that!\n"
+
+    def test_bytes_per_habit(self, hm, test_habit1, test_habit2):
+        """ testing if bytes_per_habit reports the average memory of the in-memory habits """
+        assert hm.bytes_per_habit() == 0
+
+        hm.habits = {test_habit1.name: test_habit1, test_habit2.name: test_habit2}
+        assert hm.bytes_per_habit() >= test_habit1.memory_size()
+
+    def test_checkoff_log(self, db_connection, clear_db, hm):
+        """ testing if check-offs are appended to the checkoff_log once they are flushed """
+        # unpack the tuple of connection and cursor
+        conn, cur = db_connection
+        cur.execute("DELETE FROM checkoff_log")
+        conn.commit()
+
+        hm.add_habit("gym", 1)
+        hm.add_habit("cardio", 1)
+        hm.check_off_habit("gym")
+        hm.check_off_habit("cardio")
+        # a habit that is already checked off isn't logged again
+        hm.check_off_habit("gym")
+
+        hm.checkoff_log.flush()
+        cur.execute("SELECT name, streak FROM checkoff_log ORDER BY id")
+        assert cur.fetchall() == [("gym", 1), ("cardio", 1)]
+
+        # deleting a habit also deletes its check-off history
+        hm.delete_habit("gym")
+        cur.execute("SELECT name FROM checkoff_log")
+        assert cur.fetchall() == [("cardio",)]
+
+        # a check-off that is still buffered doesn't end up in the history of a new habit with the same name
+        hm.add_habit("Yoga", 7)
+        hm.check_off_habit("yoga")
+        hm.delete_habit("yoga")
+        hm.add_habit("Yoga", 7)
+        hm.checkoff_log.flush()
+        cur.execute("SELECT name FROM checkoff_log")
+        assert cur.fetchall() == [("cardio",)]
+        hm.close()
+
+    def test_write_behind(self, db_connection, clear_db):
+        """ testing if write-behind check-offs change the memory at once and the database with the next flush """
+        # unpack the tuple of connection and cursor
+        conn, cur = db_connection
+
+        hm = HabitManager(db_name = "test.db", write_behind = True, flush_interval = 60)
+        hm.add_habit("gym", 1)
+        message = hm.check_off_habit("gym")
+
+        assert message == "You checked off the habit 'gym'.\n Awesome! You are on a 1 day streak - keep going ! \n"
+        assert hm.habits["gym"].streak == 1
+        cur.execute("SELECT streak, checked_off FROM habit WHERE name = 'gym'")
+        assert cur.fetchone() == (0, 0)
+
+        # close writes the buffered change
+        hm.close()
+        cur.execute("SELECT streak, checked_off FROM habit WHERE name = 'gym'")
+        assert cur.fetchone() == (1, 1)
+
+        # the buffered change of a deleted habit isn't written into a new habit with the same name
+        hm = HabitManager(db_name = "test.db", write_behind = True, flush_interval = 60)
+        hm.add_habit("Cardio", 1)
+        hm.check_off_habit("cardio")
+        hm.delete_habit("cardio")
+        hm.add_habit("Cardio", 1)
+        hm.close()
+        cur.execute("SELECT streak, checked_off FROM habit WHERE name = 'Cardio'")
+        assert cur.fetchone() == (0, 0)
+
+    def test_missed_windows(self, hm, db_connection, clear_db):
+        """ testing if missed_counter, missed_counts and most_misses use the window length they are given """
+        # unpack the tuple of connection and cursor
+        conn, cur = db_connection
+
+        fixed_now = datetime(2025,2,1,12,0,0)
+        cur.executemany(
+            "INSERT INTO reset_log (name, missed_time) VALUES (?,?)",
+            [("gym", (fixed_now - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')) for days in (1, 5, 20, 60, 200, 400)]
+        )
+        conn.commit()
+
+        with patch("habit_manager.datetime") as mock_datetime:
+            mock_datetime.now.return_value = fixed_now
+
+            assert hm.missed_counter("gym", days=7) == 2
+            assert hm.missed_counter("gym", days=90) == 4
+            assert hm.missed_counts("gym") == {7 : 2, 30 : 3, 90 : 4, 365 : 5}
+            assert hm.most_misses(days=365) == "The habit you struggled the most with was 'gym' with '5' missed times.\n"
+            assert hm.most_misses(days=0) == "You're doing great! You've never missed one of your habits in the past 0 days -\n I'm so proud of you!\n"
+
+    def test_next_due(self, db_connection, clear_db, hm):
+        """ testing if the due queue follows added, deleted and reset habits """
+        today = datetime.now().date()
+        assert hm.next_due() == []
+        assert hm.next_reset_time() is None
+
+        hm.add_habit("yoga", 7)
+        hm.add_habit("gym", 1)
+        hm.add_habit("cardio", 3)
+        assert hm.next_due(2) == [{'name' : "gym", 'day' : today + timedelta(days=1)}, {'name' : "cardio", 'day' : today + timedelta(days=3)}]
+        assert hm.next_reset_time() == datetime.combine(today + timedelta(days=1), time(23, 59, 57))
+
+        # a deleted habit is never due again
+        hm.delete_habit("gym")
+        assert [entry['name'] for entry in hm.next_due(5)] == ["cardio", "yoga"]
+
+        # a reset only touches the habits that are due today and schedules their next period
+        hm.habits["cardio"].creation_time = datetime.now() - timedelta(days=3)
+        hm.schedule_reset("cardio")
+        assert hm.next_due() == [{'name' : "cardio", 'day' : today}]
+        assert hm.reset_due_habits()["reset"] == 1
+        assert hm.next_due(5) == [{'name' : "cardio", 'day' : today + timedelta(days=3)}, {'name' : "yoga", 'day' : today + timedelta(days=7)}]
+        assert hm.reset_due_habits()["reset"] == 0
+
+    def test_due_listener(self, db_connection, clear_db, hm):
+        """ testing if the due listener is only called when a habit is due before all others """
+        calls = []
+        hm.due_listener = lambda: calls.append(hm.next_due()[0]['name'])
+
+        hm.add_habit("yoga", 7)
+        hm.add_habit("cardio", 3)
+        hm.add_habit("clean windows", 28)
+        assert calls == ["yoga", "cardio"]
+
+    def test_catch_up_missed_periods(self, db_connection, clear_db, hm):
+        """ testing if the periods that ended while the application was closed are logged and skipped at startup """
+        # unpack the tuple of connection and cursor
+        conn, cur = db_connection
+        now = datetime.now()
+        today = now.date()
+
+        # cardio was checked off in the first of its three ended periods, gym is due today and yoga is not due yet
+        cur.executemany(
+            "INSERT INTO habit (name, periodicity, streak, longest_streak, checked_off, creation_time, milestone) VALUES (?,?,?,?,?,?,?)",
+            [
+                ("cardio", 3, 5, 5, 1, (now - timedelta(days=10)).strftime('%Y-%m-%d %H:%M:%S'), 1),
+                ("gym", 1, 2, 2, 0, (now - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'), 0),
+                ("yoga", 7, 1, 1, 1, now.strftime('%Y-%m-%d %H:%M:%S'), 0)
+            ]
+        )
+        conn.commit()
+        hm.load_habits_into_memory()
+
+        result = hm.catch_up_missed_periods()
+        assert result["reset"] == 1
+        assert result["missed"] == 2
+
+        # the two missed periods are logged on the days they ended
+        cur.execute("SELECT name, missed_time, utc_offset FROM reset_log ORDER BY missed_time")
+        assert [(name, from_epoch(seconds, offset)) for name, seconds, offset in cur.fetchall()] == [
+            ("cardio", datetime.combine(today - timedelta(days=4), time(23, 59, 57))),
+            ("cardio", datetime.combine(today - timedelta(days=1), time(23, 59, 57)))
+        ]
+
+        cur.execute("SELECT streak, milestone, checked_off, creation_time FROM habit WHERE name = 'cardio'")
+        streak, milestone, checked_off, creation_time = cur.fetchone()
+        assert (streak, milestone, checked_off) == (0, 0, 0)
+        assert creation_time == to_epoch(now - timedelta(days=1))[0]
+        assert hm.habits["cardio"].streak == 0
+        assert hm.next_due(3) == [{'name' : "gym", 'day' : today}, {'name' : "cardio", 'day' : today + timedelta(days=2)}, {'name' : "yoga", 'day' : today + timedelta(days=7)}]
+
+        # a second launch on the same day has nothing to catch up
+        assert hm.catch_up_missed_periods()["reset"] == 0
+        assert hm.habits["gym"].streak == 2
+
+    def test_page_habits(self, db_connection, clear_db, hm):
+        """ testing if page_habits walks through all habits page by page in the chosen order """
+        for name, periodicity in [("gym", 1), ("cardio", 3), ("yoga", 7), ("reading", 1), ("clean windows", 28)]:
+            hm.add_habit(name, periodicity)
+        hm.check_off_habit("yoga")
+        hm.check_off_habit("reading")
+
+        def all_pages(**kwargs):
+            names = []
+            page = hm.page_habits(limit=2, **kwargs)
+            names.append([habit['name'] for habit in page['habits']])
+            while page['next'] is not None:
+                page = hm.page_habits(after=page['next'], limit=2, **kwargs)
+                names.append([habit['name'] for habit in page['habits']])
+            return names
+
+        assert all_pages() == [["cardio", "clean windows"], ["gym", "reading"], ["yoga"]]
+        assert all_pages(order_by="streak", descending=True) == [["yoga", "reading"], ["gym", "clean windows"], ["cardio"]]
+        assert all_pages(order_by="periodicity") == [["gym", "reading"], ["cardio", "yoga"], ["clean windows"]]
+        assert hm.page_habits(limit=1)['habits'] == [{'name' : "cardio", 'periodicity' : 3, 'streak' : 0}]
+
+        with pytest.raises(ValueError):
+            hm.page_habits(order_by="milestone")
+
+    def test_report_lines(self, db_connection, clear_db, hm):
+        """ testing if the reports are read page by page and stay the same across the pages """
+        for name, periodicity in [("gym", 1), ("cardio", 3), ("yoga", 7), ("reading", 1), ("clean windows", 28), ("walk", 1)]:
+            hm.add_habit(name, periodicity)
+        hm.check_off_habit("reading")
+
+        # pages of two habits, the generator reads the next page only when the previous one is used up
+        assert [habit['name'] for habit in hm.iter_habits(page_size=2)] == ["cardio", "clean windows", "gym", "reading", "walk", "yoga"]
+        assert list(hm.iter_habits(periodicity=1, page_size=2)) == [
+            {'name' : "gym", 'periodicity' : 1, 'streak' : 0},
+            {'name' : "reading", 'periodicity' : 1, 'streak' : 1},
+            {'name' : "walk", 'periodicity' : 1, 'streak' : 0}
+        ]
+
+        lines = hm.report_lines(page_size=2)
+        assert next(lines) == "Here is the list of all your habits with their name , streak & periodicity in days:"
+        assert list(lines)[1:3] == ["habit: cardio, streak: 0, periodicity: 3", "habit: clean windows, streak: 0, periodicity: 28"]
+        assert "\n".join(hm.report_lines(periodicity=1, page_size=2)) == hm.show_habits_by_periodicity(1)
+        assert "\n".join(hm.report_lines(page_size=2)) + "\n" == hm.show_all_habits()
+        assert list(hm.report_lines(periodicity=14)) == ["You don't have any every-2-weeks habits yet - go change that!", ""]
+
+    def test_name_case(self, db_connection, clear_db, hm):
+        """ testing if a habit is found by its name in any case, also after loading it from the database """
+        # unpack the tuple of connection and cursor
+        conn, cur = db_connection
+
+        hm.add_habit("Gym", 1)
+        hm.check_off_habit("GYM")
+        cur.execute("SELECT streak, checked_off FROM habit WHERE name = 'Gym'")
+        assert cur.fetchone() == (1, 1)
+
+        # a habit loaded from the database is keyed by its lowercase name as well
+        hm.load_habits_into_memory()
+        assert hm.habit_exists("gym")
+        with pytest.raises(ValueError):
+            hm.add_habit("gYm", 1)
+
+        # the misses are logged with the stored name and counted for the name in any case
+        now = datetime.now()
+        cur.executemany("INSERT INTO reset_log (name, missed_time, utc_offset) VALUES (?,?,?)", [("Gym", *to_epoch(now - timedelta(days=days))) for days in (1, 2)])
+        conn.commit()
+        assert hm.missed_counter("gym") == 2
+        assert hm.missed_counts("GYM")[7] == 2
+
+        hm.delete_habit("gym")
+        cur.execute("SELECT COUNT(*) FROM habit")
+        assert cur.fetchone() == (0,)
+
@@ -0,0 +1,54 @@
+import pytest
+from datetime import date
+
+# the analytics need NumPy, the other tests run without it
+np = pytest.importorskip("numpy")
+
+from habit_manager import HabitManager
+
+class TestHabitAnalytics:
+    """ This class will be used to test the vectorized analytics """
+
+    @pytest.fixture
+    def analytics(self, tmp_path):
+        """ fixture that creates habits with misses and loads them into the analytics """
+        hm = HabitManager(db_name = str(tmp_path / "analytics.db"))
+        hm.initialize_database()
+        with hm.db.transaction() as db:
+            db.executemany(
+                "INSERT INTO habit (name, periodicity, streak, longest_streak, checked_off, creation_time, milestone) VALUES (?,?,?,?,?,?,?)",
+                [("gym", 1, 9, 14, 0, "2025-02-01 10:00:00", 1), ("cardio", 3, 7, 7, 1, "2025-02-01 10:00:00", 1), ("drink 2l water", 1, 28, 28, 1, "2025-02-01 10:00:00", 4)]
+            )
+            db.executemany(
+                "INSERT INTO reset_log (name, missed_time) VALUES (?,?)",
+                [("gym", "2025-01-30 23:59:57"), ("gym", "2025-01-20 23:59:57"), ("gym", "2024-10-01 23:59:57"), ("cardio", "2025-01-25 23:59:57")]
+            )
+        analytics = hm.analytics()
+        hm.close()
+        return analytics
+
+    def test_misses_per_habit(self, analytics):
+        """ testing if the misses are counted per habit inside the window """
+        misses = dict(zip(analytics.names, analytics.misses_per_habit(30, today = date(2025, 2, 1)).tolist()))
+        assert misses == {"gym" : 2, "cardio" : 1, "drink 2l water" : 0}
+
+    def test_by_periodicity(self, analytics):
+        """ testing if completion and miss rates are calculated per periodicity """
+        stats = analytics.by_periodicity(30, today = date(2025, 2, 1))
+
+        assert stats[1]['habits'] == 2
+        assert stats[1]['completion_rate'] == 0.5
+        assert stats[1]['mean_streak'] == 18.5
+        # 2 misses in 2 habits with 30 daily periods each
+        assert stats[1]['miss_rate'] == pytest.approx(2 / 60)
+        assert stats[3]['miss_rate'] == pytest.approx(1 / 10)
+
+    def test_summary(self, analytics):
+        """ testing if the summary contains all statistics """
+        summary = analytics.summary(today = date(2025, 2, 1))
+
+        assert summary['habits'] == 3
+        assert summary['longest_streak'] == {'name' : "drink 2l water", 'longest_streak' : 28}
+        assert summary['streak_percentiles'][50] == 9
+        assert summary['streak_distribution'] == {7 : 1, 9 : 1, 28 : 1}
+        assert summary['correlations']['streak']['streak'] == pytest.approx(1)
@@ -0,0 +1,102 @@
+import http.client
+import json
+import threading
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from habit_manager import HabitManager
+from api_server import HabitAPIServer, load_test
+from main import schedule_next_reset, start_reset
+
+class TestHabitAPIServer:
+    """ This class will be used to test the JSON endpoints of the HabitAPIServer """
+
+    @pytest.fixture
+    def server(self, tmp_path):
+        """ fixture that serves an empty temporary database on a free port """
+        hm = HabitManager(db_name = str(tmp_path / "api.db"), profile = "balanced")
+        hm.initialize_database()
+        server = HabitAPIServer(hm, port = 0, max_workers = 4)
+        thread = threading.Thread(target = server.serve_forever, daemon = True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+        hm.close()
+
+    def request(self, connection, method, path, body = None):
+        """ sends a request on an open connection and returns the status and the decoded JSON """
+        connection.request(method, path, body = json.dumps(body) if body is not None else None, headers = {"Content-Type" : "application/json"})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_endpoints(self, server):
+        """ testing if the endpoints call the HabitManager over one keep-alive connection """
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_port)
+
+        assert self.request(connection, "POST", "/habits", {'name' : "gym", 'periodicity' : 1}) == (201, {'name' : "gym", 'periodicity' : 1})
+        assert self.request(connection, "POST", "/habits", {'name' : "clean windows", 'periodicity' : 28})[0] == 201
+        status, payload = self.request(connection, "POST", "/habits/gym/checkoff")
+        assert status == 200
+        assert payload['streak'] == 1
+
+        assert self.request(connection, "GET", "/habits?limit=1") == (200, {'habits' : [{'name' : "clean windows", 'periodicity' : 28, 'streak' : 0}], 'next' : ["clean windows"]})
+        assert self.request(connection, "GET", "/habits?limit=1&after=%5B%22clean%20windows%22%5D")[1]['habits'][0]['name'] == "gym"
+        assert self.request(connection, "GET", "/habits?periodicity=1") == (200, {'habits' : [{'name' : "gym", 'periodicity' : 1, 'streak' : 1}], 'next' : None})
+        assert self.request(connection, "GET", "/analytics/longest-streak") == (200, {'longest_streak' : {'name' : "gym", 'longest_streak' : 1}})
+        assert self.request(connection, "GET", "/habits/gym/misses?days=7") == (200, {'name' : "gym", 'misses' : {'7' : 0}})
+        assert self.request(connection, "DELETE", "/habits/clean%20windows")[0] == 200
+        assert self.request(connection, "GET", "/next-due")[1]['due'][0]['name'] == "gym"
+        connection.close()
+
+    def test_errors(self, server):
+        """ testing if wrong input, unknown paths and wrong methods get their status codes """
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_port)
+
+        status, payload = self.request(connection, "POST", "/habits/yoga/checkoff")
+        assert status == 400
+        assert "No habit with the name 'yoga' exists." in payload['error']
+        assert self.request(connection, "GET", "/habits?order_by=milestone")[0] == 400
+        assert self.request(connection, "POST", "/habits", {'name' : "gym", 'periodicity' : 0})[0] == 400
+        assert self.request(connection, "GET", "/missing")[0] == 404
+        assert self.request(connection, "PUT", "/habits")[0] == 405
+        assert self.request(connection, "DELETE", "/habits")[0] == 405
+        connection.close()
+
+    def test_load_test(self, server):
+        """ testing if the load test sends every request and reports the throughput """
+        result = load_test(port = server.server_port, requests = 50, concurrency = 4)
+
+        assert result['requests'] == 50
+        assert result['errors'] == 0
+        assert result['requests_per_second'] > 0
+        assert result['p50'] <= result['p99']
+
+    def test_scheduled_reset(self, server):
+        """ testing if the reset job of the server closes the due periods under the memory lock and schedules the next reset """
+        scheduler = MagicMock()
+        hm = server.api.habit_manager
+        hm.add_habit("gym", 1)
+        hm.habits["gym"].creation_time = datetime.now() - timedelta(days = 1)
+        hm.schedule_reset("gym")
+
+        # the reset must not run while a request thread changes the habits
+        locked = []
+        reset_due_habits = hm.reset_due_habits
+        def reset():
+            acquired = []
+            thread = threading.Thread(target = lambda: acquired.append(server.api.memory_lock.acquire(blocking = False)))
+            thread.start()
+            thread.join()
+            locked.append(not acquired[0])
+            return reset_due_habits()
+        hm.reset_due_habits = reset
+
+        assert schedule_next_reset(scheduler, hm, server.api) is not None
+        start_reset(*scheduler.add_job.call_args.kwargs["args"])
+
+        assert locked == [True]
+        assert hm.habits["gym"].creation_time.date() == datetime.now().date()
+        # the next reset is scheduled with the server again
+        assert scheduler.add_job.call_count == 2
+        assert scheduler.add_job.call_args.kwargs["args"][2] is server.api
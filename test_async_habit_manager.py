@@ -0,0 +1,72 @@
+import pytest
+import asyncio
+import time
+from habit_manager import HabitManager
+from async_habit_manager import AsyncHabitManager
+
+class TestAsyncHabitManager:
+    """ This class will be used to test the awaitable methods of the class AsyncHabitManager """
+
+    @pytest.fixture
+    def hm(self, tmp_path):
+        """ fixture that creates a HabitManager with an empty temporary database """
+        hm = HabitManager(db_name = str(tmp_path / "async.db"), profile = "balanced")
+        hm.initialize_database()
+        return hm
+
+    def test_writes_and_reads(self, hm):
+        """ testing if concurrent writes are applied and the reads see them """
+        async def scenario():
+            manager = AsyncHabitManager(hm)
+            # the writes are queued at the same time and share the writer thread
+            await asyncio.gather(manager.add_habit("gym", 1), manager.add_habit("cardio", 3))
+            messages = await asyncio.gather(manager.check_off_habit("gym"), manager.check_off_habit("cardio"))
+            report = await manager.show_all_habits()
+            counts = await asyncio.gather(manager.missed_counter("gym"), manager.most_misses())
+            await manager.close()
+            return messages, report, counts
+
+        messages, report, counts = asyncio.run(scenario())
+
+        assert messages[0] == "You checked off the habit 'gym'.\n Awesome! You are on a 1 day streak - keep going ! \n"
+        assert "habit: cardio, streak: 1, periodicity: 3" in report
+        assert counts[0] == 0
+        assert hm.db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_failed_write_only_fails_its_call(self, hm):
+        """ testing if an invalid write raises in its own coroutine without undoing the others """
+        async def scenario():
+            manager = AsyncHabitManager(hm)
+            results = await asyncio.gather(manager.add_habit("gym", 1), manager.delete_habit("missing"), return_exceptions = True)
+            await manager.close()
+            return results
+
+        results = asyncio.run(scenario())
+
+        assert isinstance(results[1], ValueError)
+        assert hm.db.execute("SELECT name FROM habit").fetchall() == [("gym",)]
+
+    def test_writes_while_check_offs_are_committed(self, tmp_path):
+        """ testing if a write doesn't wait forever while the group commit thread writes the check-off log """
+        hm = HabitManager(db_name = str(tmp_path / "burst.db"), checkoff_latency = 0.01, profile = "balanced")
+        hm.initialize_database()
+        # a slow commit of the check-off log keeps the lock of the buffer while the deletion flushes it
+        write = hm.checkoff_log.write
+        def slow_write(rows):
+            time.sleep(0.2)
+            return write(rows)
+        hm.checkoff_log.write = slow_write
+
+        async def scenario():
+            manager = AsyncHabitManager(hm)
+            await manager.add_habit("gym", 1)
+            await manager.check_off_habit("gym")
+            # the group commit thread is writing the check-off now
+            await asyncio.sleep(0.1)
+            await manager.delete_habit("gym")
+            await manager.close()
+
+        # a deadlock between the writer thread and the group commit thread never finishes
+        asyncio.run(asyncio.wait_for(scenario(), timeout = 5))
+
+        assert hm.db.execute("SELECT COUNT(*) FROM habit").fetchone()[0] == 0
@@ -0,0 +1,22 @@
+from benchmark import run, compare
+
+def test_run_small_database():
+    """ testing if the benchmark times every hot path on a small seeded database """
+    report = run([20], repeat = 3)
+    results = report["results"]["20"]
+    assert report["startup"] > 0
+
+    for operation in ["startup_without_snapshot", "startup_with_snapshot", "load_habits_into_memory", "save_snapshot", "load_from_snapshot", "add_habit", "check_off_habit", "delete_habit", "show_all_habits", "first_report_page", "most_misses", "missed_counter", "scheduled_reset"]:
+        assert results[operation] >= 0
+
+def test_repeat_larger_than_the_database():
+    """ testing if the benchmark only checks off seeded habits when it repeats more often than there are habits """
+    results = run([4], repeat = 5)["results"]["4"]
+    assert results["check_off_habit"] >= 0
+
+def test_compare():
+    """ testing if compare only reports operations that got slower than the threshold """
+    baseline = {"results" : {"1000" : {"add_habit" : 0.001, "most_misses" : 0.002}}}
+    report = {"results" : {"1000" : {"add_habit" : 0.0015, "most_misses" : 0.0021, "delete_habit" : 0.5}}}
+
+    assert compare(report, baseline, threshold = 1.2) == [("1000", "add_habit", 0.001, 0.0015)]
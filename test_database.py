@@ -0,0 +1,119 @@
+import pytest
+import threading
+from database import ConnectionManager, PROFILES
+
+class TestConnectionManager:
+    """ This class will be used to test the methods of the class ConnectionManager """
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        """ fixture that creates a connection manager for a temporary database """
+        db = ConnectionManager(str(tmp_path / "pool.db"))
+        db.execute("CREATE TABLE item (value INTEGER)")
+        yield db
+        db.close()
+
+    def test_connection_is_reused(self, db):
+        """ testing if the same thread always gets the same open connection """
+        assert db.connection() is db.connection()
+
+    def test_connection_per_thread(self, db):
+        """ testing if another thread gets its own connection """
+        connections = []
+        thread = threading.Thread(target = lambda: connections.append(db.connection()))
+        thread.start()
+        thread.join()
+
+        assert connections[0] is not db.connection()
+
+    def test_nested_transaction_commits_once(self, db):
+        """ testing if a nested transaction only commits with the outer block and rolls back as a whole """
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO item VALUES (1)")
+            with db.transaction() as inner:
+                inner.execute("INSERT INTO item VALUES (2)")
+            # the inner block must not have committed yet
+            assert conn.in_transaction
+
+        assert db.execute("SELECT COUNT(*) FROM item").fetchone()[0] == 2
+
+        with pytest.raises(ValueError):
+            with db.transaction() as conn:
+                conn.execute("INSERT INTO item VALUES (3)")
+                raise ValueError("abort")
+
+        assert db.execute("SELECT COUNT(*) FROM item").fetchone()[0] == 2
+
+    def test_close(self, db):
+        """ testing if close opens a fresh connection on the next call """
+        old_connection = db.connection()
+        db.close()
+
+        assert db.connection() is not old_connection
+
+    def test_own_writes_keep_data_version(self, db):
+        """ testing if writes of any thread of the manager don't change the data version, but writes of other connections do """
+        version = db.data_version()
+
+        def write():
+            with db.transaction() as conn:
+                conn.execute("INSERT INTO item VALUES (1)")
+        thread = threading.Thread(target = write)
+        thread.start()
+        thread.join()
+        assert db.data_version() == version
+
+        other = ConnectionManager(db.db_name)
+        with other.transaction() as conn:
+            conn.execute("INSERT INTO item VALUES (2)")
+        other.close()
+        assert db.data_version() != version
+
+    @pytest.mark.parametrize("profile", sorted(PROFILES))
+    def test_profiles(self, tmp_path, profile):
+        """ testing if the pragmas of a tuning profile are in effect on the connections """
+        db = ConnectionManager(str(tmp_path / f"{profile}.db"), profile = profile)
+        pragmas = db.pragmas()
+        db.close()
+
+        expected = PROFILES[profile]
+        assert pragmas["journal_mode"] == expected["journal_mode"].lower()
+        # synchronous is reported as a number: OFF = 0, NORMAL = 1, FULL = 2
+        assert pragmas["synchronous"] == {"OFF" : 0, "NORMAL" : 1, "FULL" : 2}[expected["synchronous"]]
+        assert pragmas["cache_size"] == expected["cache_size"]
+        assert pragmas["busy_timeout"] == expected["busy_timeout"]
+
+    def test_unknown_profile(self):
+        """ testing if an unknown profile is rejected """
+        with pytest.raises(ValueError):
+            ConnectionManager("test.db", profile = "fastest")
+
+    def test_wal_is_kept(self, tmp_path):
+        """ testing if a durable connection doesn't switch a WAL database back while another connection has it open """
+        db_name = str(tmp_path / "shared.db")
+        balanced = ConnectionManager(db_name, profile = "balanced")
+        with balanced.transaction() as conn:
+            conn.execute("CREATE TABLE habit(name TEXT)")
+
+        durable = ConnectionManager(db_name)
+        with durable.transaction() as conn:
+            conn.execute("INSERT INTO habit VALUES ('gym')")
+        assert durable.pragmas()["journal_mode"] == "wal"
+        assert balanced.execute("SELECT name FROM habit").fetchall() == [("gym",)]
+        durable.close()
+        balanced.close()
+
+    def test_read_transaction(self, tmp_path):
+        """ testing if the queries of a read transaction don't see commits made while it is open """
+        db = ConnectionManager(str(tmp_path / "snapshot.db"), profile = "balanced")
+        with db.transaction() as conn:
+            conn.execute("CREATE TABLE item (value INTEGER)")
+            conn.execute("INSERT INTO item VALUES (1)")
+
+        with db.read_transaction() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM item").fetchone()[0] == 1
+            with db.transaction() as writer:
+                writer.execute("INSERT INTO item VALUES (2)")
+            assert conn.execute("SELECT value FROM item").fetchall() == [(1,)]
+        assert db.execute("SELECT COUNT(*) FROM item").fetchone()[0] == 2
+        db.close()
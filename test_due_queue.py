@@ -0,0 +1,39 @@
+from due_queue import DueQueue
+
+class TestDueQueue:
+    """ This class will be used to test the priority queue of due days """
+
+    def test_pop_until(self):
+        """ testing if only the entries due on or before a day are taken from the queue """
+        queue = DueQueue()
+        queue.rebuild([("gym", 10), ("cardio", 12), ("yoga", 11)])
+
+        assert queue.pop_until(11) == [(10, "gym"), (11, "yoga")]
+        assert len(queue) == 1
+        assert queue.peek() == (12, "cardio")
+        assert queue.pop_until(11) == []
+
+    def test_reschedule_and_remove(self):
+        """ testing if rescheduled and removed habits leave no valid entries behind """
+        queue = DueQueue()
+        queue.schedule("gym", 10)
+        queue.schedule("cardio", 11)
+        # moving a habit to another day drops its old entry
+        queue.schedule("gym", 15)
+        queue.remove("cardio")
+        # scheduling the same day twice returns the habit once
+        queue.schedule("yoga", 12)
+        queue.schedule("yoga", 12)
+
+        assert queue.upcoming(5) == [(12, "yoga"), (15, "gym")]
+        assert queue.pop_until(20) == [(12, "yoga"), (15, "gym")]
+        assert queue.peek() is None
+
+    def test_compaction(self):
+        """ testing if the heap is rebuilt once it is mostly made of old entries """
+        queue = DueQueue()
+        for day in range(1000):
+            queue.schedule("gym", day)
+
+        assert len(queue.heap) < 100
+        assert queue.upcoming(2) == [(999, "gym")]
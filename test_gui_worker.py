@@ -0,0 +1,67 @@
+import threading
+import time
+import pytest
+from gui_worker import BackgroundWorker
+
+class TestBackgroundWorker:
+    """ This class will be used to test the background worker of the GUI """
+
+    @pytest.fixture
+    def worker(self):
+        """ fixture that creates a worker and stops its thread after the test """
+        worker = BackgroundWorker()
+        yield worker
+        worker.close()
+
+    def wait_for(self, worker):
+        """ polls the worker like the Tk main loop until every request is handed back """
+        deadline = time.monotonic() + 5
+        while worker.busy and time.monotonic() < deadline:
+            worker.poll()
+            time.sleep(0.001)
+        assert not worker.busy
+
+    def test_results_on_polling_thread(self, worker):
+        """ testing if the function runs on the worker thread and the callback on the thread that polls """
+        results = []
+        worker.submit(lambda: threading.current_thread().name, on_done = lambda name: results.append((name, threading.current_thread().name)))
+        assert worker.busy
+
+        self.wait_for(worker)
+        assert results == [("gui-worker", threading.current_thread().name)]
+
+    def test_errors(self, worker):
+        """ testing if an exception of the function is handed to on_error """
+        errors = []
+
+        def fail():
+            raise ValueError("No habit with the name 'gym' exists.")
+
+        worker.submit(fail, on_done = lambda result: errors.append("done"), on_error = errors.append)
+        self.wait_for(worker)
+        assert [str(error) for error in errors] == ["No habit with the name 'gym' exists."]
+
+    def test_stale_requests(self, worker):
+        """ testing if a newer request with the same tag cancels the older ones and untagged requests always run """
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        shown = []
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "slow report"
+
+        # the first report is running while three more requests are queued behind it
+        worker.submit(slow, on_done = shown.append, tag = "report")
+        started.wait(5)
+        worker.submit(lambda: calls.append("all habits") or "all habits", on_done = shown.append, tag = "report")
+        worker.submit(lambda: calls.append("check off") or "check off", on_done = shown.append)
+        worker.submit(lambda: calls.append("daily habits") or "daily habits", on_done = shown.append, tag = "report")
+        release.set()
+
+        self.wait_for(worker)
+        # the replaced report never ran and the result of the running one was dropped
+        assert calls == ["check off", "daily habits"]
+        assert shown == ["check off", "daily habits"]
@@ -0,0 +1,64 @@
+import pytest
+from habits import Habits
+from habit_index import HabitIndex
+
+class TestHabitIndex:
+    """ This class will be used to test the methods of the class HabitIndex """
+
+    @pytest.fixture
+    def habits(self):
+        """ fixture with habits of different periodicities and streaks """
+        return {
+            "gym" : Habits(name = "gym", periodicity = 1, streak = 9, longest_streak = 14),
+            "cardio" : Habits(name = "cardio", periodicity = 3, streak = 7, longest_streak = 7),
+            "drink 2l water" : Habits(name = "drink 2l water", periodicity = 1, streak = 28, longest_streak = 28)
+        }
+
+    @pytest.fixture
+    def index(self, habits):
+        """ fixture that creates an index over the habits """
+        index = HabitIndex()
+        index.rebuild(habits)
+        return index
+
+    def test_rebuild(self, index):
+        """ testing if rebuild orders the habits by streak """
+        assert len(index) == 3
+        assert index.top_k("streak", 2) == [("drink 2l water", 28), ("gym", 9)]
+
+    def test_update(self, index, habits):
+        """ testing if update moves a changed habit and adds a new one """
+        habits["gym"].streak = 30
+        habits["gym"].longest_streak = 30
+        index.update("gym", habits["gym"])
+
+        assert index.top_k("longest_streak", 1) == [("gym", 30)]
+        assert index.top_k("streak", 1) == [("gym", 30)]
+
+        # a new habit is inserted at the position of its values
+        index.update("yoga", Habits(name = "yoga", periodicity = 3, streak = 8))
+        assert index.top_k("streak", 4) == [("gym", 30), ("drink 2l water", 28), ("yoga", 8), ("cardio", 7)]
+
+    def test_update_many(self, index, habits):
+        """ testing if a batch update gives the same order as single updates """
+        habits["gym"].streak = 0
+        habits["cardio"].streak = 40
+        index.update_many([("gym", habits["gym"]), ("cardio", habits["cardio"])])
+
+        assert index.top_k("streak", 3) == [("cardio", 40), ("drink 2l water", 28), ("gym", 0)]
+
+    def test_remove(self, index):
+        """ testing if remove deletes a habit from all indexes """
+        index.remove("cardio")
+
+        assert ("cardio", 7) not in index.top_k("streak", 10)
+        assert ("cardio", 7) not in index.top_k("longest_streak", 10)
+        assert len(index) == 2
+
+    def test_top_k(self, index):
+        """ testing if top_k handles k larger than the index and unknown metrics """
+        assert len(index.top_k("streak", 10)) == 3
+        assert index.top_k("streak", 0) == []
+
+        with pytest.raises(ValueError):
+            index.top_k("milestone", 1)
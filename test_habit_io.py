@@ -0,0 +1,91 @@
+import pytest
+import io
+from habit_manager import HabitManager
+from datetime import datetime
+from habit_io import read_csv, read_jsonl, main
+from timestamps import from_epoch
+
+class TestHabitIO:
+    """ This class will be used to test the bulk import and export of habits """
+
+    @pytest.fixture
+    def hm(self, tmp_path):
+        """ fixture that creates a HabitManager with an empty temporary database """
+        hm = HabitManager(db_name = str(tmp_path / "import.db"))
+        hm.initialize_database()
+        yield hm
+        hm.close()
+
+    def test_import_habits(self, hm):
+        """ testing if import_habits inserts all new habits in batches and reports duplicates and invalid rows """
+        hm.add_habit("gym", 1)
+        rows = [
+            {"name" : "cardio", "periodicity" : "3", "streak" : "2", "longest_streak" : "5"},
+            {"name" : "Gym", "periodicity" : "1"},
+            {"name" : "yoga", "periodicity" : "7", "creation_time" : "2025-02-01 10:00:00"},
+            {"name" : "cardio", "periodicity" : "3"},
+            {"name" : "reading", "periodicity" : "every day"},
+            {"periodicity" : "1"}
+        ]
+
+        result = hm.import_habits(iter(rows), batch_size = 1)
+
+        assert result["imported"] == 2
+        assert result["duplicates"] == ["Gym", "cardio"]
+        assert [row_number for row_number, message in result["invalid"]] == [5, 6]
+
+        assert hm.habits["cardio"].longest_streak == 5
+        streak, creation_time, utc_offset = hm.db.execute("SELECT streak, creation_time, utc_offset FROM habit WHERE name = 'yoga'").fetchone()
+        assert (streak, from_epoch(creation_time, utc_offset)) == (0, datetime(2025, 2, 1, 10))
+        assert hm.show_habits_by_periodicity(3) == "\nThese are your every-3-day habits: \n\nhabit: cardio, streak: 2"
+
+    def test_import_invalid_lines(self, hm):
+        """ testing if malformed JSON lines and creation times with a UTC offset are reported without losing the other rows """
+        stream = io.StringIO(
+            '{"name" : "gym", "periodicity" : 1}\n'
+            '{"name" : "cardio", "periodicity" : \n'
+            '\n'
+            '{"name" : "yoga", "periodicity" : 7, "creation_time" : "2025-02-01T10:00:00+02:00"}\n'
+            '{"name" : "reading", "periodicity" : 1, "creation_time" : 20250201}\n'
+            '{"name" : "walk", "periodicity" : 2, "creation_time" : "2025-02-01T10:00:00"}\n'
+        )
+
+        result = hm.import_habits(read_jsonl(stream), batch_size = 10)
+
+        assert result["imported"] == 2
+        assert [row_number for row_number, message in result["invalid"]] == [2, 3, 4]
+        assert "without a UTC offset" in result["invalid"][1][1]
+        assert sorted(hm.habits) == ["gym", "walk"]
+        assert hm.habits["walk"].creation_time == datetime(2025, 2, 1, 10)
+
+    @pytest.mark.parametrize("file_format, reader", [("csv", read_csv), ("jsonl", read_jsonl)])
+    def test_export_and_import(self, hm, tmp_path, file_format, reader):
+        """ testing if exported habits can be imported into another database """
+        hm.add_habit("gym", 1)
+        hm.add_habit("cardio", 3)
+        hm.check_off_habit("gym")
+
+        stream = io.StringIO()
+        assert hm.export_habits(stream, file_format) == 2
+
+        other = HabitManager(db_name = str(tmp_path / f"copy_{file_format}.db"))
+        other.initialize_database()
+        stream.seek(0)
+        result = other.import_habits(reader(stream))
+        other.close()
+
+        assert result == {'imported' : 2, 'duplicates' : [], 'invalid' : []}
+        assert other.habits["gym"].streak == 1
+
+    def test_command_line(self, tmp_path, capsys):
+        """ testing if the command line entry point imports and exports files """
+        source = tmp_path / "habits.csv"
+        source.write_text("name,periodicity\ngym,1\ncardio,3\ngym,1\n")
+        db_name = str(tmp_path / "cli.db")
+
+        main(["import", str(source), "--db", db_name])
+        assert "imported 2 habits, skipped 1 duplicates" in capsys.readouterr().out
+
+        target = tmp_path / "habits.jsonl"
+        main(["export", str(target), "--db", db_name])
+        assert len(target.read_text().splitlines()) == 2
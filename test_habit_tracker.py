@@ -0,0 +1,75 @@
+import subprocess
+import sys
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from habit_manager import HabitManager
+from habit_tracker import main
+from timestamps import to_epoch
+
+class TestHabitTracker:
+    """ This class will be used to test the headless command line interface """
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        """ fixture that returns the name of a new temporary database """
+        return str(tmp_path / "cli.db")
+
+    def test_commands(self, db, capsys):
+        """ testing if the subcommands call the HabitManager and print its messages """
+        assert main(["--db", db, "add", "gym", "1"]) == 0
+        assert main(["--db", db, "add", "yoga", "7"]) == 0
+        assert main(["--db", db, "checkoff", "gym"]) == 0
+        capsys.readouterr()
+
+        assert main(["--db", db, "list", "--periodicity", "1"]) == 0
+        assert "habit: gym, streak: 1" in capsys.readouterr().out
+
+        assert main(["--db", db, "longest-streak"]) == 0
+        assert capsys.readouterr().out == "Your longest streak is 1 for the habit 'gym'.\n"
+
+        assert main(["--db", db, "next-due", "--count", "1"]) == 0
+        assert capsys.readouterr().out.strip().endswith(": gym")
+
+        assert main(["--db", db, "delete", "yoga"]) == 0
+        assert main(["--db", db, "missed", "gym"]) == 0
+        assert "was missed 0 times" in capsys.readouterr().out
+
+    def test_errors(self, db, capsys):
+        """ testing if an unknown habit is reported on stderr with a non-zero exit code """
+        assert main(["--db", db, "checkoff", "gym"]) == 1
+        assert "No habit with the name 'gym' exists." in capsys.readouterr().err
+        assert main(["--db", db, "add", "gym", "0"]) == 1
+        assert "The periodicity must be a positive number of days." in capsys.readouterr().err
+
+    def test_changes_while_the_gui_is_open(self, db):
+        """ testing if a manager that stays open picks up a check-off of the command line before it resets the habit """
+        hm = HabitManager(db, profile = "balanced")
+        hm.initialize_database()
+        # gym was created yesterday, so its period ends today
+        hm.db.execute("INSERT INTO habit (name, name_key, periodicity, creation_time, utc_offset) VALUES ('gym', 'gym', 1, ?, ?)", to_epoch(datetime.now() - timedelta(days = 1)))
+        hm.db.connection().commit()
+        hm.load_habits_into_memory()
+
+        assert main(["--db", db, "checkoff", "gym"]) == 0
+        result = hm.reset_due_habits()
+
+        assert (result["reset"], result["missed"]) == (1, 0)
+        assert hm.db.execute("SELECT streak, checked_off FROM habit").fetchone() == (1, 0)
+        assert hm.db.execute("SELECT COUNT(*) FROM reset_log").fetchone() == (0,)
+        hm.close()
+
+    def test_gui_options(self, db):
+        """ testing if the gui command opens the chosen database with the chosen snapshot setting """
+        with patch("main.main") as gui_main:
+            assert main(["--db", db, "--no-snapshot", "gui"]) == 0
+            assert main(["--db", db, "gui"]) == 0
+        assert gui_main.call_args_list[0].args == (db,)
+        assert gui_main.call_args_list[0].kwargs == {'snapshot' : False}
+        assert gui_main.call_args_list[1].kwargs == {'snapshot' : True}
+
+    def test_lazy_imports(self):
+        """ testing if the command line doesn't import the GUI, the scheduler or the metrics server """
+        code = "import sys, habit_tracker; print(sorted({'customtkinter', 'GUI', 'apscheduler', 'http.server'} & set(sys.modules)))"
+        result = subprocess.run([sys.executable, "-c", code], capture_output = True, text = True, check = True)
+        assert result.stdout.strip() == "[]"
@@ -1,5 +1,6 @@
 import pytest 
 from habits import Habits
+from timestamps import from_epoch
 from datetime import datetime, timedelta
 from unittest.mock import patch
 import sqlite3
@@ -152,12 +153,12 @@ class TestHabits:
         test_habit1.reset_checked_off()
 
         # fetch updated habit data from the database
-        cur.execute("SELECT streak, checked_off, creation_time, milestone FROM habit WHERE name = ?", (test_habit1.name,))
+        cur.execute("SELECT streak, checked_off, creation_time, utc_offset, milestone FROM habit WHERE name = ?", (test_habit1.name,))
         # store the fetched values from fetchone (which fetches one row from the SQL query) in new variables
-        updated_streak, updated_checked_off, updated_creation_time, updated_milestone = cur.fetchone()
+        updated_streak, updated_checked_off, updated_creation_time, utc_offset, updated_milestone = cur.fetchone()
 
-        # convert the creation_time back to a datetime object
-        updated_creation_time = datetime.strptime(updated_creation_time,"%Y-%m-%d %H:%M:%S")
+        # convert the epoch seconds back to a local datetime object
+        updated_creation_time = from_epoch(updated_creation_time, utc_offset)
 
         # expected next period start
         expected_creation_time = (test_habit1.creation_time + timedelta(days=int(test_habit1.periodicity)))
@@ -181,3 +182,16 @@ class TestHabits:
   
 
 
+    def test_compact_representation(self, test_habit1):
+        """ testing if habits use slots with typed values and report their memory size """
+        # slots replace the per-instance dictionary
+        assert not hasattr(test_habit1, "__dict__")
+        with pytest.raises(AttributeError):
+            test_habit1.unknown_attribute = 1
+
+        # the periodicity is stored as a number and a creation_time string is parsed once
+        habit = Habits(name = "yoga", periodicity = "2", creation_time = "2025-02-01 10:00:00")
+        assert habit.periodicity == 2
+        assert habit.creation_time == datetime(2025, 2, 1, 10, 0, 0)
+
+        assert habit.memory_size() > 0
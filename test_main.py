@@ -2,7 +2,9 @@ import pytest
 from unittest import mock
 from unittest.mock import MagicMock, patch
 from habit_manager import HabitManager
-from main import scheduled_reset
+from datetime import datetime, timedelta
+from gui_worker import BackgroundWorker
+from main import scheduled_reset, schedule_next_reset, start_reset
 
 @pytest.fixture
 def habit_manager():
@@ -15,16 +17,52 @@ def habit_manager():
     return mock_manager
 
 def test_scheduled_reset(habit_manager):
-    """ testing if scheduled_reset calls reset_checked_off for all the habits """
+    """ testing if scheduled_reset runs the bulk reset of the HabitManager once """
 
     # call the method
-    scheduled_reset(habit_manager)
+    result = scheduled_reset(habit_manager)
 
-    # check if reset_checked_off was called for each habit
+    # check if the bulk reset was called once instead of resetting every habit on its own
+    habit_manager.reset_due_habits.assert_called_once_with()
+    assert result is habit_manager.reset_due_habits.return_value
     for habit in habit_manager.habits.values():
-        habit.reset_checked_off.assert_called_once()
+        habit.reset_checked_off.assert_not_called()
 
-@patch("main.BackgroundScheduler")
+def test_schedule_next_reset(habit_manager):
+    """ testing if the reset job is set to the next due habit and removed without habits """
+    scheduler = MagicMock()
+    next_reset = datetime.now() + timedelta(days = 2)
+    habit_manager.next_reset_time.return_value = next_reset
+
+    assert schedule_next_reset(scheduler, habit_manager) == next_reset
+    assert scheduler.add_job.call_args.kwargs["run_date"] == next_reset
+    assert scheduler.add_job.call_args.kwargs["id"] == "reset"
+    # a reset that couldn't run on time, e.g. while the computer was asleep, still runs
+    assert scheduler.add_job.call_args.kwargs["misfire_grace_time"] is None
+    assert scheduler.add_job.call_args.kwargs["coalesce"] is True
+
+    # a reset that is overdue runs right away
+    habit_manager.next_reset_time.return_value = datetime.now() - timedelta(days = 1)
+    assert schedule_next_reset(scheduler, habit_manager) > datetime.now() - timedelta(minutes = 1)
+
+    habit_manager.next_reset_time.return_value = None
+    assert schedule_next_reset(scheduler, habit_manager) is None
+    scheduler.remove_job.assert_called_once_with("reset")
+
+def test_start_reset_on_the_worker(habit_manager):
+    """ testing if the reset job runs the reset on the worker thread of the GUI and schedules the next one """
+    scheduler = MagicMock()
+    habit_manager.next_reset_time.return_value = datetime.now() + timedelta(days = 1)
+    worker = BackgroundWorker()
+
+    start_reset(scheduler, habit_manager, worker)
+    worker.close()
+    worker.poll()
+
+    habit_manager.reset_due_habits.assert_called_once_with()
+    assert scheduler.add_job.call_args.kwargs["args"][2] is worker
+
+@patch("apscheduler.schedulers.background.BackgroundScheduler")
 def test_scheduler_starts(self):
     """ testing if the scheduler starts correctly """
 
@@ -0,0 +1,63 @@
+import pytest
+from urllib.request import urlopen
+from habit_manager import HabitManager
+from metrics import metrics
+
+class TestMetrics:
+    """ This class will be used to test the instrumentation of the HabitManager """
+
+    @pytest.fixture
+    def hm(self, tmp_path):
+        """ fixture that creates a HabitManager with enabled metrics """
+        hm = HabitManager(db_name = str(tmp_path / "metrics.db"))
+        hm.initialize_database()
+        metrics.reset()
+        metrics.enable()
+        yield hm
+        metrics.disable()
+        metrics.reset()
+        hm.close()
+
+    def test_records_operations(self, hm):
+        """ testing if calls, errors, rows and commits are recorded per operation """
+        hm.add_habit("gym", 1)
+        hm.check_off_habit("gym")
+        with pytest.raises(ValueError):
+            hm.delete_habit("missing")
+        hm.load_habits_into_memory()
+
+        operations = metrics.as_dict()
+        assert operations["add_habit"]["calls"] == 1
+        assert operations["add_habit"]["commits"] == 1
+        # every habit row that changes also counts up the change counter in the meta table
+        assert operations["add_habit"]["rows_written"] == 2
+        assert operations["write_habit_updates"]["rows_written"] == 2
+        assert operations["delete_habit"]["errors"] == 1
+        assert operations["load_habits_into_memory"]["rows_read"] == 1
+        # the histogram counts are cumulative, the last bucket holds every call
+        assert operations["add_habit"]["histogram"][float("inf")] == 1
+
+    def test_disabled(self, hm):
+        """ testing if nothing is recorded while the metrics are disabled """
+        metrics.disable()
+        hm.add_habit("gym", 1)
+
+        assert metrics.as_dict() == {}
+
+    def test_prometheus_export(self, hm, tmp_path):
+        """ testing if the metrics are exported as Prometheus text to a file and over HTTP """
+        hm.add_habit("gym", 1)
+
+        path = tmp_path / "habit_tracker.prom"
+        metrics.write_prometheus(path)
+        text = path.read_text()
+        assert '# TYPE habit_tracker_operation_seconds histogram' in text
+        assert 'habit_tracker_operation_seconds_count{operation="add_habit"} 1' in text
+        assert 'habit_tracker_commits_total{operation="add_habit"} 1' in text
+
+        server = metrics.serve(port = 0)
+        try:
+            with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+                assert 'operation="add_habit"' in response.read().decode()
+        finally:
+            server.shutdown()
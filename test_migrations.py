@@ -0,0 +1,151 @@
+import pytest
+import sqlite3
+from database import ConnectionManager
+from datetime import date, datetime
+from migrations import MIGRATIONS, add_name_key, create_miss_daily, habit_changes, migrate, schema_version, store_epoch_times
+from timestamps import day_number, from_epoch, to_epoch
+
+class TestMigrations:
+    """ This class will be used to test the schema migrations """
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        """ fixture that creates a connection manager for an empty temporary database """
+        db = ConnectionManager(str(tmp_path / "migrate.db"))
+        yield db
+        db.close()
+
+    def index_names(self, db):
+        """ returns the names of all indexes in the database """
+        return {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+    def test_migrate_new_database(self, db):
+        """ testing if a new database gets all tables, indexes and the latest version """
+        assert migrate(db) == len(MIGRATIONS)
+        assert schema_version(db) == len(MIGRATIONS)
+        assert "idx_reset_log_name_missed_time" in self.index_names(db)
+        assert "idx_habit_name_key" in self.index_names(db)
+
+    def test_migrate_existing_database(self, db):
+        """ testing if a database created before the migrations is upgraded in place without losing rows """
+        # create the tables like the old initialize_database did, without a schema version
+        conn = sqlite3.connect(db.db_name)
+        conn.execute("CREATE TABLE habit(name TEXT PRIMARY KEY, periodicity INTEGER NOT NULL, streak INTEGER DEFAULT 0, longest_streak INTEGER DEFAULT 0, checked_off INTEGER DEFAULT 0, creation_time TEXT, milestone INTEGER DEFAULT 0)")
+        conn.execute("CREATE TABLE reset_log(id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, missed_time TEXT DEFAULT NULL)")
+        conn.execute("INSERT INTO habit (name, periodicity, creation_time) VALUES ('gym', 1, '2025-02-01 10:00:00')")
+        conn.commit()
+        conn.close()
+
+        assert schema_version(db) == 0
+        migrate(db)
+
+        assert schema_version(db) == len(MIGRATIONS)
+        assert db.execute("SELECT name FROM habit").fetchall() == [("gym",)]
+
+        # running the migration again doesn't change anything
+        assert migrate(db) == len(MIGRATIONS)
+
+    def test_queries_use_indexes(self, db):
+        """ testing if the per-habit queries are answered with an index instead of a full table scan """
+        migrate(db)
+
+        plan = db.execute("EXPLAIN QUERY PLAN SELECT COUNT(*) FROM reset_log WHERE name = ? AND missed_time >= ?", ("gym", "2025-01-01")).fetchall()
+        assert "idx_reset_log_name_missed_time" in str(plan)
+
+        plan = db.execute("EXPLAIN QUERY PLAN DELETE FROM habit WHERE name_key = ?", ("gym",)).fetchall()
+        assert "idx_habit_name_key" in str(plan)
+
+        # the pages of the habit list start right after the cursor in the index
+        plan = db.execute("EXPLAIN QUERY PLAN SELECT name FROM habit WHERE (streak, name) < (?, ?) ORDER BY streak DESC, name DESC LIMIT 20", (3, "gym")).fetchall()
+        assert "idx_habit_streak_name" in str(plan)
+        assert "TEMP B-TREE" not in str(plan)
+
+        # the reports of one periodicity are paged by name with the (periodicity, name) index
+        plan = db.execute("EXPLAIN QUERY PLAN SELECT name FROM habit WHERE periodicity = ? AND (name) > (?) ORDER BY name ASC LIMIT 500", (1, "gym")).fetchall()
+        assert "idx_habit_periodicity_name" in str(plan)
+        assert "TEMP B-TREE" not in str(plan)
+
+    def test_miss_daily_counts(self, db):
+        """ testing if logged misses are counted per habit and day, including the ones logged before the upgrade """
+        # apply every step before the daily counts and log a miss like an old database
+        with db.transaction() as conn:
+            for step in MIGRATIONS[:MIGRATIONS.index(create_miss_daily)]:
+                step(conn)
+            conn.execute("INSERT INTO reset_log (name, missed_time) VALUES ('gym', '2025-02-01 23:59:57')")
+            conn.execute(f"PRAGMA user_version = {MIGRATIONS.index(create_miss_daily)}")
+        migrate(db)
+
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO reset_log (name, missed_time) VALUES ('gym', '2025-02-01 08:00:00')")
+            conn.execute("INSERT INTO reset_log (name, missed_time) VALUES ('gym', '2025-02-02 08:00:00')")
+        # the days are counted since 1970 in local time
+        assert db.execute("SELECT day, misses FROM miss_daily ORDER BY day").fetchall() == [(day_number(date(2025, 2, 1)), 2), (day_number(date(2025, 2, 2)), 1)]
+
+        # deleting the log entries removes their counts
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM reset_log WHERE missed_time < ?", (to_epoch(datetime(2025, 2, 2))[0],))
+        assert db.execute("SELECT day, misses FROM miss_daily").fetchall() == [(day_number(date(2025, 2, 2)), 1)]
+
+    def test_name_key_backfill(self, db):
+        """ testing if existing habits get their name_key and names that only differ in case are kept apart """
+        with db.transaction() as conn:
+            for step in MIGRATIONS[:MIGRATIONS.index(add_name_key)]:
+                step(conn)
+            conn.execute("INSERT INTO habit (name, periodicity, creation_time) VALUES ('Gym', 1, '2025-02-01 10:00:00')")
+            conn.execute("INSERT INTO habit (name, periodicity, creation_time) VALUES ('gym', 1, '2025-02-01 10:00:00')")
+            conn.execute("INSERT INTO habit (name, periodicity, creation_time) VALUES ('Übung', 7, '2025-02-01 10:00:00')")
+            conn.execute("INSERT INTO reset_log (name, missed_time) VALUES ('gym', '2025-02-01 23:59:57')")
+            conn.execute(f"PRAGMA user_version = {MIGRATIONS.index(add_name_key)}")
+        migrate(db)
+
+        assert db.execute("SELECT name, name_key FROM habit ORDER BY rowid").fetchall() == [("Gym", "gym"), ("gym (2)", "gym (2)"), ("Übung", "übung")]
+        # the log entries follow the renamed habit
+        assert db.execute("SELECT name FROM reset_log").fetchall() == [("gym (2)",)]
+        assert db.execute("SELECT name FROM miss_daily").fetchall() == [("gym (2)",)]
+
+        # a row inserted without a key gets one and the key stays unique
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO habit (name, periodicity) VALUES ('Yoga', 7)")
+        assert db.execute("SELECT name_key FROM habit WHERE name = 'Yoga'").fetchone() == ("yoga",)
+        with pytest.raises(sqlite3.IntegrityError):
+            with db.transaction() as conn:
+                conn.execute("INSERT INTO habit (name, periodicity) VALUES ('YOGA', 7)")
+
+
+    def test_store_epoch_times(self, db):
+        """ testing if the TEXT times are converted into epoch seconds with the local UTC offset """
+        with db.transaction() as conn:
+            for step in MIGRATIONS[:MIGRATIONS.index(store_epoch_times)]:
+                step(conn)
+            conn.execute("INSERT INTO habit (name, periodicity, creation_time) VALUES ('gym', 1, '2025-02-01 10:00:00')")
+            conn.execute("INSERT INTO reset_log (name, missed_time) VALUES ('gym', '2025-02-01 23:59:57')")
+            conn.execute("INSERT INTO checkoff_log (name, checked_off_time, streak) VALUES ('gym', '2025-01-31 08:30:00', 3)")
+            conn.execute(f"PRAGMA user_version = {MIGRATIONS.index(store_epoch_times)}")
+        migrate(db)
+
+        creation_time, utc_offset = db.execute("SELECT creation_time, utc_offset FROM habit").fetchone()
+        assert (creation_time, utc_offset) == to_epoch(datetime(2025, 2, 1, 10))
+        assert from_epoch(*db.execute("SELECT missed_time, utc_offset FROM reset_log").fetchone()) == datetime(2025, 2, 1, 23, 59, 57)
+        assert from_epoch(*db.execute("SELECT checked_off_time, utc_offset FROM checkoff_log").fetchone()) == datetime(2025, 1, 31, 8, 30)
+        assert db.execute("SELECT day, misses FROM miss_daily").fetchall() == [(day_number(date(2025, 2, 1)), 1)]
+
+        # other tools that still write TEXT times are converted by the triggers
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO habit (name, periodicity, creation_time) VALUES ('yoga', 7, '2025-02-03 07:00:00')")
+            conn.execute("INSERT INTO reset_log (name, missed_time) VALUES ('gym', '2025-02-01 08:00:00')")
+        assert db.execute("SELECT typeof(creation_time) FROM habit WHERE name = 'yoga'").fetchone() == ("integer",)
+        assert db.execute("SELECT misses FROM miss_daily").fetchall() == [(2,)]
+
+    def test_habit_changes(self, db):
+        """ testing if every insert, update and delete of a habit counts up the change counter """
+        migrate(db)
+        assert habit_changes(db) == 0
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO habit (name, name_key, periodicity) VALUES ('gym', 'gym', 1)")
+            conn.execute("UPDATE habit SET streak = 1 WHERE name_key = 'gym'")
+            # the logs don't change the habits in memory
+            conn.execute("INSERT INTO reset_log (name, missed_time) VALUES ('gym', 0)")
+        assert habit_changes(db) == 2
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM habit")
+        assert habit_changes(db) == 3
@@ -0,0 +1,120 @@
+import pytest
+import os
+import sqlite3
+from datetime import datetime
+from habits import Habits
+from habit_manager import HabitManager
+from snapshot import HEADER, read_snapshot, snapshot_path, write_snapshot
+
+class TestSnapshot:
+    """ This class will be used to test the binary snapshot of the in-memory habits """
+
+    @pytest.fixture
+    def db_name(self, tmp_path):
+        """ fixture that returns the name of a new temporary database """
+        return str(tmp_path / "snapshot.db")
+
+    @pytest.fixture
+    def habits(self):
+        """ fixture for the habits written into a snapshot, keyed by their lowercase name """
+        return {
+            "gym" : Habits(name = "Gym", periodicity = 1, streak = 4, longest_streak = 9, milestone = 1, checked_off = 1, creation_time = datetime(2025, 2, 1, 10, 30)),
+            "übung (2)" : Habits(name = "Übung (2)", periodicity = 7, creation_time = datetime(2025, 1, 28, 23, 59, 57))
+        }
+
+    def test_round_trip(self, db_name, habits):
+        """ testing if the habits come back with all values while the schema version and the change counter match """
+        path = snapshot_path(db_name)
+        write_snapshot(path, habits, {"gym" : 739284, "übung (2)" : 739285}, 8, 42)
+
+        assert list(read_snapshot(path, 8, 42)) == [
+            ("gym", "Gym", datetime(2025, 2, 1, 10, 30), 739284, 1, 4, 9, 1, 1),
+            ("übung (2)", "Übung (2)", datetime(2025, 1, 28, 23, 59, 57), 739285, 7, 0, 0, 0, 0)
+        ]
+        # an empty manager writes an empty snapshot
+        write_snapshot(path, {}, {}, 8, 43)
+        assert list(read_snapshot(path, 8, 43)) == []
+
+    def test_stale_or_damaged(self, db_name, habits):
+        """ testing if a snapshot that doesn't match the database or can't be read is ignored """
+        path = snapshot_path(db_name)
+        assert read_snapshot(path, 8, 42) is None
+
+        write_snapshot(path, habits, {"gym" : 739284, "übung (2)" : 739285}, 8, 42)
+        assert read_snapshot(path, 8, 43) is None
+        assert read_snapshot(path, 9, 42) is None
+
+        # a file cut off while it was copied
+        with open(path, "r+b") as file:
+            file.truncate(os.path.getsize(path) - 1)
+        assert read_snapshot(path, 8, 42) is None
+        with open(path, "r+b") as file:
+            file.truncate(HEADER.size - 1)
+        assert read_snapshot(path, 8, 42) is None
+
+        # a name with the separator in it can't be split again
+        habits["gym"].name = "G\0ym"
+        write_snapshot(path, habits, {"gym" : 739284, "übung (2)" : 739285}, 8, 42)
+        assert read_snapshot(path, 8, 42) is None
+
+    def test_in_memory_database(self):
+        """ testing if an in-memory database has no snapshot file """
+        assert snapshot_path(":memory:") is None
+        assert snapshot_path("habit.db") == "habit.db.snapshot"
+
+    def test_manager_warm_start(self, db_name):
+        """ testing if the next manager loads the habits from the snapshot written on close and falls back after changes """
+        hm = HabitManager(db_name, snapshot = True)
+        hm.initialize_database()
+        hm.load_habits_into_memory()
+        hm.add_habit("Gym", 1)
+        hm.add_habit("cardio", 3)
+        hm.check_off_habit("gym")
+        hm.close()
+        assert os.path.exists(snapshot_path(db_name))
+
+        hm = HabitManager(db_name, snapshot = True)
+        hm.initialize_database()
+        assert hm.load_snapshot() is True
+        hm.load_habits_into_memory()
+        assert hm.snapshot_changes is not None
+        gym = hm.habits["gym"]
+        assert (gym.name, gym.periodicity, gym.streak, gym.checked_off) == ("Gym", 1, 1, 1)
+        assert hm.habits["cardio"].periodicity == 3
+        assert hm.index.top_k("streak", 1) == [("gym", 1)]
+        assert [entry['name'] for entry in hm.next_due(2)] == ["Gym", "cardio"]
+
+        # a change made through the manager is written into a new snapshot on close
+        hm.check_off_habit("cardio")
+        hm.close()
+        hm = HabitManager(db_name, snapshot = True)
+        assert hm.load_snapshot() is True
+        assert hm.habits["cardio"].streak == 1
+        hm.close()
+
+        # a change made by another program makes the snapshot stale
+        conn = sqlite3.connect(db_name)
+        conn.execute("UPDATE habit SET streak = 7 WHERE name_key = 'gym'")
+        conn.commit()
+        conn.close()
+        hm = HabitManager(db_name, snapshot = True)
+        assert hm.load_snapshot() is False
+        hm.load_habits_into_memory()
+        assert hm.habits["gym"].streak == 7
+        hm.close()
+
+    def test_no_snapshot_of_old_habits(self, db_name):
+        """ testing if habits that are older than the database are not written into a snapshot """
+        hm = HabitManager(db_name, snapshot = True)
+        hm.initialize_database()
+        # nothing was loaded yet
+        assert hm.save_snapshot() is False
+        hm.load_habits_into_memory()
+
+        conn = sqlite3.connect(db_name)
+        conn.execute("INSERT INTO habit (name, name_key, periodicity) VALUES ('yoga', 'yoga', 7)")
+        conn.commit()
+        conn.close()
+        assert hm.save_snapshot() is False
+        assert not os.path.exists(snapshot_path(db_name))
+        hm.close()
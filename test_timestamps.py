@@ -0,0 +1,27 @@
+import pytest
+from datetime import date, datetime
+from timestamps import EPOCH_ORDINAL, day_number, from_epoch, to_epoch
+
+class TestTimestamps:
+    """ This class will be used to test the conversion between local datetimes and epoch seconds """
+
+    @pytest.mark.parametrize("moment", [datetime(2025, 2, 1, 10), datetime(2025, 7, 1, 23, 59, 57), datetime(1970, 1, 1)])
+    def test_round_trip(self, moment):
+        """ testing if a local time comes back unchanged from its epoch seconds and offset """
+        seconds, offset = to_epoch(moment)
+        assert isinstance(seconds, int)
+        assert seconds == moment.astimezone().timestamp()
+        assert from_epoch(seconds, offset) == moment
+
+    def test_fractions_are_dropped(self):
+        """ testing if the microseconds are cut off like the old text format did """
+        assert from_epoch(*to_epoch(datetime(2025, 2, 1, 10, 0, 0, 999999))) == datetime(2025, 2, 1, 10)
+
+    def test_missing_offset(self):
+        """ testing if rows without an offset are read as UTC """
+        assert from_epoch(86400, None) == datetime(1970, 1, 2)
+
+    def test_day_number(self):
+        """ testing if the day numbers count the days since 1970 """
+        assert day_number(date(1970, 1, 1)) == 0
+        assert day_number(date(2025, 2, 1)) + EPOCH_ORDINAL == date(2025, 2, 1).toordinal()
@@ -0,0 +1,80 @@
+import pytest
+import threading
+from write_buffer import GroupCommitBuffer
+
+class TestGroupCommitBuffer:
+    """ This class will be used to test the methods of the class GroupCommitBuffer """
+
+    @pytest.fixture
+    def groups(self):
+        """ fixture that records every group of rows that gets written """
+        return []
+
+    def test_burst_shares_one_write(self, groups):
+        """ testing if rows added within the latency are written together """
+        written = threading.Event()
+        buffer = GroupCommitBuffer(lambda rows: (groups.append(rows), written.set()), max_latency = 0.2)
+        for row in range(5):
+            buffer.add(row)
+
+        assert written.wait(2)
+        assert groups == [[0, 1, 2, 3, 4]]
+        buffer.close()
+
+    def test_max_size_flushes_early(self, groups):
+        """ testing if a full buffer is written before the latency is reached """
+        written = threading.Event()
+        buffer = GroupCommitBuffer(lambda rows: (groups.append(rows), written.set()), max_latency = 60, max_size = 3)
+        for row in range(3):
+            buffer.add(row)
+
+        assert written.wait(2)
+        assert groups == [[0, 1, 2]]
+        buffer.close()
+
+    def test_close_flushes(self, groups):
+        """ testing if close writes the remaining rows and rejects new ones """
+        buffer = GroupCommitBuffer(groups.append, max_latency = 60)
+        buffer.add("gym")
+
+        assert buffer.close() == 1
+        assert groups == [["gym"]]
+        with pytest.raises(RuntimeError):
+            buffer.add("cardio")
+
+    def test_failed_write_keeps_rows(self, groups):
+        """ testing if rows of a failed write stay in the buffer """
+        def write(rows):
+            raise OSError("disk full")
+
+        buffer = GroupCommitBuffer(write, max_latency = 60)
+        buffer.add("gym")
+        with pytest.raises(OSError):
+            buffer.flush()
+        assert len(buffer) == 1
+
+        buffer.write = groups.append
+        buffer.close()
+        assert groups == [["gym"]]
+
+    def test_key_merges_rows(self, groups):
+        """ testing if rows with the same key are merged into the latest one """
+        buffer = GroupCommitBuffer(groups.append, max_latency = 60, key = lambda row: row[0])
+        buffer.add(("gym", 1))
+        buffer.add(("cardio", 1))
+        buffer.add(("gym", 2))
+
+        assert len(buffer) == 2
+        buffer.close()
+        assert groups == [[("cardio", 1), ("gym", 2)]]
+
+    def test_discard(self, groups):
+        """ testing if a discarded row is not written """
+        buffer = GroupCommitBuffer(groups.append, max_latency = 60, key = lambda row: row[0])
+        buffer.add(("gym", 1))
+        buffer.add(("cardio", 1))
+        buffer.discard("gym")
+        buffer.discard("yoga")
+
+        buffer.close()
+        assert groups == [[("cardio", 1)]]
@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+
+# the database stores times as integer seconds since 1970-01-01 UTC together with the UTC offset of the local time zone
+# the habits work with naive local datetimes, so a period always ends at the same wall-clock time, also across DST changes
+EPOCH = datetime(1970, 1, 1)
+# date.toordinal() of 1970-01-01, miss_daily stores its days as days since that date
+EPOCH_ORDINAL = EPOCH.toordinal()
+SECONDS_PER_DAY = 86400
+
+
+def to_epoch(moment):
+    """ converts a naive local datetime into (epoch seconds, UTC offset in seconds) """
+    # astimezone treats a naive datetime as local time and adds the offset that was valid at that moment
+    offset = int(moment.astimezone().utcoffset().total_seconds())
+    return (moment - EPOCH) // timedelta(seconds = 1) - offset, offset
+
+def from_epoch(seconds, offset):
+    """ converts stored epoch seconds back into the naive local time they were recorded at """
+    return EPOCH + timedelta(seconds = seconds + (offset or 0))
+
+def day_number(day):
+    """ returns the number miss_daily.day stores for a local date """
+    return day.toordinal() - EPOCH_ORDINAL
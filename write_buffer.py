@@ -0,0 +1,105 @@
+import threading
+from time import monotonic
+
+
+class GroupCommitBuffer:
+    """ collects rows from many writes and hands them to one flush call, so a burst of writes shares one commit """
+
+    def __init__(self, write, max_latency = 0.5, max_size = 500, key = None):
+        # write(rows) stores a list of rows in a single transaction
+        self.write = write
+        # longest time in seconds a row waits in the buffer before it is written
+        self.max_latency = max_latency
+        # number of rows that triggers a flush before the latency is reached
+        self.max_size = max_size
+        # with a key function a new row replaces the pending row with the same key, so only the latest state is written
+        self.key = key
+        self.pending = {} if key else []
+        self.closed = False
+        self.condition = threading.Condition()
+        # keeps the rows of concurrent flushes in the order they were added
+        self.write_lock = threading.Lock()
+        # the background thread is only started with the first row
+        self.thread = None
+
+    def __len__(self):
+        with self.condition:
+            return len(self.pending)
+
+    def add(self, row):
+        """ adds a row that will be written within max_latency seconds """
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("The buffer is closed, no more rows can be added.")
+            if self.key:
+                # move the key to the end so the rows are written in the order of their last change
+                self.pending.pop(self.key(row), None)
+                self.pending[self.key(row)] = row
+            else:
+                self.pending.append(row)
+            if self.thread is None:
+                self.thread = threading.Thread(target = self.run, name = "group-commit", daemon = True)
+                self.thread.start()
+            # wake the background thread for the first row of a group and when the buffer is full
+            if len(self.pending) == 1 or len(self.pending) >= self.max_size:
+                self.condition.notify()
+
+    def discard(self, key):
+        """ drops the pending row with the given key without writing it, only for a buffer with a key function """
+        with self.condition:
+            self.pending.pop(key, None)
+
+    def run(self):
+        """ background loop that writes the pending rows once the oldest one reached the latency or the buffer is full """
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                # wait for more rows to join the group until the latency of the first row is used up
+                deadline = monotonic() + self.max_latency
+                while len(self.pending) < self.max_size and not self.closed:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self.closed:
+                    # close() writes the remaining rows itself
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                # the rows stay in the buffer and are written with the next group
+                print(f"Writing the buffered rows failed, retrying with the next group: {e}")
+
+    def flush(self):
+        """ writes all pending rows on the calling thread and returns their number """
+        with self.write_lock:
+            with self.condition:
+                rows = list(self.pending.values()) if self.key else self.pending
+                self.pending = {} if self.key else []
+            if not rows:
+                return 0
+            try:
+                self.write(rows)
+            except Exception:
+                # put the rows back in front of the ones added in the meantime
+                with self.condition:
+                    if self.key:
+                        restored = {self.key(row): row for row in rows}
+                        restored.update(self.pending)
+                        self.pending = restored
+                    else:
+                        self.pending[:0] = rows
+                raise
+            return len(rows)
+
+    def close(self):
+        """ stops the background thread and writes the remaining rows """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        return self.flush()